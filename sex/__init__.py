@@ -3,20 +3,30 @@ import sys
 import ast
 import traceback
 import json
+import ctypes
+import threading
 
+from contextlib import contextmanager
 from functools import partial
 from time import gmtime, strftime
+from PySide2.QtCore import Qt, QThread, Signal
 from PySide2.QtGui import QFont, QIcon
-from PySide2.QtWidgets import QApplication, QMainWindow, QToolBar
+from PySide2.QtWidgets import QApplication, QMainWindow, QProgressBar, QProgressDialog, QPushButton, QToolBar
 
 sys.path.append(os.path.dirname(__file__))
 
 import codeeditor
 import sd
+import sexcompiler
 import sexeditor
+import sexemit
+import sexindex
 import sexparser
+import sexprofile
+import sexreport
 import sexsyntax
 import jinja2
+from sd.api.sdhistoryutils import SDHistoryUtils
 
 ctx = sd.getContext()
 app = ctx.getSDApplication()
@@ -24,6 +34,328 @@ ui_mgr = app.getUIMgr()
 qt_mgr = app.getQtForPythonUIMgr()
 
 parser = sexparser.NodeCreator()
+# signatures of imported function graphs are reused across sessions until their packages change
+parser.function_index = sexindex.FunctionIndex(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "function_index.json"))
+
+# the snippet frame keeps the compile key of the graph after the source
+compile_key_prefix = "# compiled: "
+
+
+def split_snippet(description: str) -> tuple:
+    src, _, last_line = description.rpartition("\n")
+    if last_line.startswith(compile_key_prefix):
+        return src, last_line[len(compile_key_prefix):]
+    return description, None
+
+
+def join_snippet(src: str, compile_key: str = None) -> str:
+    if compile_key is None:
+        return src
+    return f"{src}\n{compile_key_prefix}{compile_key}"
+
+
+def save_snippet(frame_object: sd.api.SDGraphObjectFrame, src: str, compile_key: str = None):
+    """Save [src] with [compile_key] to [frame_object] unless it's there already
+    (every write is an undo step and marks the package as modified)"""
+    description = join_snippet(src, compile_key)
+    if frame_object.getDescription() != description:
+        frame_object.setDescription(description)
+
+
+def graph_compile_key(graph: sd.api.SDGraph, frame_object: sd.api.SDGraphObjectFrame) -> str:
+    """Compile key saved with [graph] in [frame_object]. It's None if the graph has no output node
+    (e.g. it was emptied by hand) so the graph is never reported as up to date then."""
+    _, graph_key = split_snippet(frame_object.getDescription())
+    if graph.getOutputNodes().getSize() == 0:
+        return None
+    return graph_key
+
+
+def find_snippet_frame(graph: sd.api.SDGraph) -> sd.api.SDGraphObjectFrame:
+    snippet_frame = None
+    graph_objects = graph.getGraphObjects()
+
+    for i in range(graph_objects.getSize()):
+        graph_object = graph_objects.getItem(i)
+        if isinstance(graph_object, sd.api.SDGraphObjectFrame):
+            snippet_frame = graph_object
+
+    return snippet_frame
+
+
+def snippet_package_dir(graph: sd.api.SDGraph) -> str:
+    """Directory where templates included by snippets of [graph] are looked up"""
+    return os.path.dirname(graph.getPackage().getFilePath())
+
+
+def render_snippet(graph: sd.api.SDGraph, src: str) -> str:
+    return sexcompiler.render_source(src, snippet_package_dir(graph))
+
+
+@contextmanager
+def suspended_updates(widget):
+    """Defer repainting of [widget] and its children (other windows aren't affected)"""
+    widget.setUpdatesEnabled(False)
+    try:
+        yield
+    finally:
+        widget.setUpdatesEnabled(True)
+
+
+compile_failed = "failed"
+compile_up_to_date = "up to date"
+compile_done = "compiled"
+compile_canceled = "canceled"
+# the compile thread met a function or a graph that has to be resolved on the main thread
+compile_unresolved = "unresolved"
+
+
+def build_snippet(compiler: sexemit.GraphEmitter, src: str, package_dir: str, graph_key: str,
+                  console, progress=None, node_budget: int = 0, connection_budget: int = 0,
+                  report_lines: int = 0) -> tuple:
+    """Render, parse and compile snippet [src] without touching SD so it can run off the main thread.
+
+    [graph_key] is the compile key saved with the graph, [progress] is called with the name of each phase.
+    Graphs with more nodes or connections than [node_budget] or [connection_budget] fail to compile.
+    The [report_lines] snippet lines producing most of the nodes are printed after compilation.
+    Returns (status, compile key, compiled graph for emit_snippet()).
+    """
+    if progress is not None:
+        progress("Rendering template...")
+
+    try:
+        with compiler.profile("render"):
+            stripped_src, source_lines = sexcompiler.render_source_lines(src, package_dir)
+    except jinja2.TemplateError as e:
+        console.console_message(str(e))
+        return compile_failed, None, None
+
+    compile_key = compiler.compile_key(stripped_src)
+    if compile_key == graph_key:
+        console.console_message("Graph is up to date")
+        return compile_up_to_date, compile_key, None
+
+    ast_tree = None
+    if compile_key not in compiler.compile_cache:
+        if progress is not None:
+            progress("Parsing...")
+
+        try:
+            with compiler.profile("parse"):
+                ast_tree = ast.parse(stripped_src, mode="exec")
+        except SyntaxError as err:
+            console.console_message(str(err))
+            console.console_message(err.text)
+            return compile_failed, compile_key, None
+
+    if progress is not None:
+        progress("Compiling graph...")
+
+    try:
+        with compiler.profile("compile"):
+            compiled = compiler.compile_graph(ast_tree, compile_key)
+    except sexcompiler.ParserError as err:
+        console.console_message(str(err))
+        return compile_failed, compile_key, None
+
+    if report_lines > 0:
+        for line in sexreport.line_report(compiled[0], src, source_lines, report_lines, stripped_src):
+            console.console_message(line)
+
+    try:
+        compiler.check_budget(compiled[0], node_budget, connection_budget, source_lines)
+    except sexcompiler.ParserError as err:
+        console.console_message(str(err))
+        return compile_failed, compile_key, None
+
+    return compile_done, compile_key, compiled
+
+
+def emit_snippet(graph: sd.api.SDGraph, frame_object: sd.api.SDGraphObjectFrame, src: str, compile_key: str,
+                 compiled: tuple, console, profiler: sexprofile.Profiler = None, graph_key: str = None) -> str:
+    """Update [graph] with [compiled] graph from build_snippet() (SD API is used so it runs on the main thread).
+
+    [graph_key] is the compile key saved with the graph before, the graph isn't read again if it was emitted with it.
+    """
+    console.console_message("Update nodes...")
+    parser.graph = graph
+    parser.main_window = console
+    parser.profiler = profiler
+
+    # the whole update is a single undo step and SD views are repainted once it's done
+    with SDHistoryUtils.UndoGroup("Compile Expression"), suspended_updates(qt_mgr.getMainWindow()):
+        try:
+            parser.emit_compiled(compiled, graph_key, compile_key)
+        except sexcompiler.ParserError as err:
+            console.console_message(str(err))
+            save_snippet(frame_object, src)
+            return compile_failed
+        except Exception as err:
+            console.console_message("Unhandled exception")
+            console.console_message(str(err))
+            console.console_message(traceback.format_exc())
+            save_snippet(frame_object, src)
+            return compile_failed
+
+        console.console_message("Nodes are succesfully created")
+        save_snippet(frame_object, src, compile_key)
+
+    return compile_done
+
+
+def compile_snippet(graph: sd.api.SDGraph, frame_object: sd.api.SDGraphObjectFrame, src: str,
+                    console, settings) -> str:
+    """Compile snippet [src] into [graph] and save it with its compile key to [frame_object].
+
+    Messages go to [console].console_message(), budgets come from PluginSettings [settings].
+    Returns one of compile_* statuses.
+    """
+    graph_key = graph_compile_key(graph, frame_object)
+
+    profiler = sexprofile.Profiler() if settings["profile"] else None
+
+    parser.main_window = console
+    parser.profiler = profiler
+    status, compile_key, compiled = build_snippet(parser, src, snippet_package_dir(graph), graph_key, console,
+                                                  node_budget=settings["node_budget"],
+                                                  connection_budget=settings["connection_budget"],
+                                                  report_lines=settings["line_report"])
+
+    if status == compile_done:
+        status = emit_snippet(graph, frame_object, src, compile_key, compiled, console, profiler, graph_key)
+
+    if status != compile_done:
+        # a graph which failed to compile doesn't match the source anymore
+        save_snippet(frame_object, src, compile_key if status == compile_up_to_date else None)
+
+    if profiler is not None:
+        report_profile(profiler, graph.getIdentifier(), console, settings)
+
+    return status
+
+
+def report_profile(profiler: sexprofile.Profiler, graph_id: str, console, settings):
+    """Print [profiler] summary to [console] and write it to profile_dir from [settings] if it's set"""
+    for line in profiler.summary():
+        console.console_message(line)
+
+    profile_dir = settings["profile_dir"]
+    if profile_dir:
+        trace_path = os.path.join(profile_dir, f"{graph_id}.profile.json")
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.write(trace_path)
+        except OSError as err:
+            console.console_message(f"Can't write profile: {err}")
+        else:
+            console.console_message(f"Profile is written to {trace_path}")
+
+
+class CompileCanceled(Exception):
+    pass
+
+
+class UnresolvedGraph(Exception):
+    """Inputs of graph [graph_id] (declared in an included template) weren't read on the main thread"""
+
+    def __init__(self, graph_id: str):
+        super().__init__(f"Inputs of graph [{graph_id}] aren't read")
+        self.graph_id = graph_id
+
+
+class ThreadGraphEmitter(sexemit.GraphEmitter):
+    """Compiler of the compile thread: it can only use inputs of graphs read before the thread started"""
+
+    def get_graph_inputs(self, graph_id: str) -> list:
+        if graph_id not in self.graph_inputs:
+            raise UnresolvedGraph(graph_id)
+        return self.graph_inputs[graph_id]
+
+
+class CompileThread(QThread):
+    """Runs build_snippet() for the snippet editor off the main thread.
+
+    The compiler is a copy of the plugin one sharing its compile cache, so the thread never touches SD or widgets:
+    messages and phase names are delivered to the main thread by [message] and [progress] signals.
+    """
+
+    message = Signal(str)
+    progress = Signal(str)
+
+    def __init__(self, src: str, package_dir: str, graph_key: str, node_budget: int = 0, connection_budget: int = 0,
+                 report_lines: int = 0, profiler: sexprofile.Profiler = None, parent=None):
+        super().__init__(parent)
+        self.src = src
+        self.package_dir = package_dir
+        self.graph_key = graph_key
+        self.node_budget = node_budget
+        self.connection_budget = connection_budget
+        self.report_lines = report_lines
+        self.status = compile_failed
+        self.compile_key = None
+        self.compiled = None
+        self.unresolved_function = None
+        self.unresolved_graph = None
+        self.thread_id = None
+        self.cancel_lock = threading.Lock()
+
+        self.compiler = ThreadGraphEmitter()
+        self.compiler.imported_functions = parser.imported_functions.offline_copy()
+        self.compiler.graph_inputs = dict(parser.graph_inputs)
+        self.compiler.compile_cache = parser.compile_cache
+        self.compiler.profiler = profiler
+
+    def console_message(self, message):
+        self.message.emit(message)
+
+    def run(self):
+        try:
+            try:
+                with self.cancel_lock:
+                    self.thread_id = threading.get_ident()
+
+                self.status, self.compile_key, self.compiled = build_snippet(
+                    self.compiler, self.src, self.package_dir, self.graph_key, self, self.progress.emit,
+                    self.node_budget, self.connection_budget, self.report_lines)
+
+                for message in self.compiler.messages:
+                    self.message.emit(message)
+            finally:
+                with self.cancel_lock:
+                    self.thread_id = None
+        except CompileCanceled:
+            self.status = compile_canceled
+            self.message.emit("Compilation is canceled")
+        except sexindex.UnresolvedFunction as err:
+            self.status = compile_unresolved
+            self.unresolved_function = err.alias
+        except UnresolvedGraph as err:
+            self.status = compile_unresolved
+            self.unresolved_graph = err.graph_id
+        except Exception as err:
+            self.status = compile_failed
+            self.message.emit("Unhandled exception")
+            self.message.emit(str(err))
+            self.message.emit(traceback.format_exc())
+
+    def cancel(self):
+        """Interrupt the compilation (a single long native call such as ast.parse() finishes first)"""
+        with self.cancel_lock:
+            if self.thread_id is not None:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread_id),
+                                                           ctypes.py_object(CompileCanceled))
+
+
+class BatchConsole:
+    """Prints compile messages of graph [graph_id] to SD Python console"""
+
+    def __init__(self, graph_id: str):
+        self.graph_id = graph_id
+
+    def console_message(self, message):
+        print(f"[{self.graph_id}] {message}")
+
 
 class PluginSettings:
     def __init__(self):
@@ -39,7 +371,11 @@ class PluginSettings:
     "tab_font_size": 11,
     "button_font_size": 13,
     "tab_spaces": 4,
-    "align_max_nodes": 50,
+    "node_budget": 0,
+    "connection_budget": 0,
+    "line_report": 10,
+    "profile": false,
+    "profile_dir": "",
     "window_pos": [
         233,
         229
@@ -102,6 +438,18 @@ class MainWindow(QMainWindow):
 
 
         self.ui.compile.clicked.connect(self.create_nodes)
+        self.compile_thread: CompileThread = None
+
+        self.compile_progress = QProgressBar()
+        self.compile_progress.setRange(0, 0)
+        self.compile_progress.setMaximumWidth(150)
+        self.compile_progress.hide()
+        self.statusBar().addPermanentWidget(self.compile_progress)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.hide()
+        self.cancel_button.clicked.connect(self.cancel_compile)
+        self.statusBar().addPermanentWidget(self.cancel_button)
         self.ui.tabs.currentChanged.connect(self.tab_change)
         self.ui.code_editor.init_code_completion(parser.keywords + self.get_package_inputs())
         self.frame_object: sd.api.SDGraphObjectFrame = None
@@ -130,13 +478,13 @@ class MainWindow(QMainWindow):
         
        
 
-        builtin_functions = ([*sexparser.function_node_map]
-                             + [*sexparser.vectors_map]
+        builtin_functions = ([*sexcompiler.function_node_map]
+                             + [*sexcompiler.vectors_map]
                              + [*parser.imported_functions]
-                             + [*sexparser.samplers_map]
+                             + [*sexcompiler.samplers_map]
                              + ["range"])
 
-        builtin_types = [*sexparser.constants_map] + [*sexparser.get_variable_map] + [*sexparser.casts_map]
+        builtin_types = [*sexcompiler.constants_map] + [*sexcompiler.get_variable_map] + [*sexcompiler.casts_map]
 
         self.highlighter.setup_rules(builtin_functions, builtin_types)
         self.view_highlighter.setup_rules(builtin_functions, builtin_types)
@@ -162,6 +510,13 @@ class MainWindow(QMainWindow):
         return list(result)
 
     def closeEvent(self, event):
+        if self.compile_thread is not None:
+            self.compile_thread.finished.disconnect(self.compile_finished)
+            self.compile_thread.cancel()
+            self.compile_thread.wait()
+            self.save_source(self.compile_thread.src)
+            self.compile_thread = None
+
         self.plugin_settings["window_size"] = [self.width(), self.height()]
         self.plugin_settings["window_pos"] = [self.pos().x(), self.pos().y()]
         self.plugin_settings.save()
@@ -170,81 +525,113 @@ class MainWindow(QMainWindow):
         if tab_index == 1:
             src = self.ui.code_editor.toPlainText()
             try:
-                src = self.get_rendered_code(src)
+                stripped_src = self.get_rendered_code(src)
             except jinja2.TemplateError as e:
                 self.console_message(str(e))
                 return
             
-            stripped_src = "\n".join([line.lstrip() for line in src.splitlines()])
             self.ui.render_view.setPlainText(stripped_src)
 
 
     def get_rendered_code(self, code):
-        package_file = self.graph.getPackage().getFilePath()
-        package_dir = os.path.dirname(package_file)
-
-        jenv = jinja2.Environment(loader=jinja2.FileSystemLoader(package_dir))
-
-        jenv.lstrip_blocks = True
-        jenv.trim_blocks = True
-        jenv.line_statement_prefix = "::"
-
-        src_template = jenv.from_string(code)
-        return src_template.render()
-
-
+        return render_snippet(self.graph, code)
 
     def console_message(self, message):
         timestamp = strftime("[%H:%M:%S] ", gmtime())
         self.ui.console_output.appendPlainText(timestamp + message)
         self.ui.console_output.repaint()
 
-    def save_source(self):
-        src = self.ui.code_editor.toPlainText()
-        self.frame_object.setDescription(src)
+    def save_source(self, src: str, compile_key: str = None):
+        save_snippet(self.frame_object, src, compile_key)
+
+    def get_compile_key(self, src):
+        stripped_src = self.get_rendered_code(src)
+        return stripped_src, parser.compile_key(stripped_src)
+
+    def check_snippet_state(self):
+        _, graph_key = split_snippet(self.frame_object.getDescription())
+        if graph_key is None:
+            return
 
-    def parse_expression_tree(self, ast_tree):
-        parser.graph = self.graph
-        parser.main_window = self
         try:
-            parser.parse_module(ast_tree)
-        except sexparser.ParserError as err:
-            self.console_message(str(err))
-        except Exception as err:
-            self.console_message("Unhandled exception")
-            self.console_message(str(err))
-            self.console_message(traceback.format_exc())
-        else:
-            self.console_message("Nodes are succesfully created")
+            _, compile_key = self.get_compile_key(self.ui.code_editor.toPlainText())
+        except jinja2.TemplateError:
+            return
+
+        if compile_key != graph_key:
+            self.console_message("Graph is out of date with the snippet, COMPILE to update it")
+
+    def set_compiling(self, compiling: bool):
+        self.ui.compile.setEnabled(not compiling)
+        self.compile_progress.setVisible(compiling)
+        self.cancel_button.setVisible(compiling)
+        self.cancel_button.setEnabled(True)
+        if not compiling:
+            self.statusBar().clearMessage()
 
     def create_nodes(self):
+        if self.compile_thread is not None:
+            return
+
         self.console_message("Compiling...")
         src = self.ui.code_editor.toPlainText()
-        self.frame_object.setDescription(src)
 
-        try:
-            src = self.get_rendered_code(src)
-        except jinja2.TemplateError as e:
-            self.console_message(str(e))
+        # the source is saved when the compilation is over so a compile is a single undo step
+        self.start_compile(src, graph_compile_key(self.graph, self.frame_object))
+
+    def start_compile(self, src: str, graph_key: str, graph_ids=()):
+        # everything the compile thread needs from SD is read here: inputs of graphs declared in [src]
+        # and [graph_ids] (graphs declared in included templates are asked for by the compile thread)
+        graph_ids = {match[1] for match in sexcompiler.declared_graph_pattern.findall(src)}.union(graph_ids)
+        parser.import_graph_inputs(self.graph.getPackage(), graph_ids)
+        parser.imported_functions.resolve(parser.referenced_functions(src))
+        parser.function_index.save()
+
+        profiler = sexprofile.Profiler() if self.plugin_settings["profile"] else None
+        self.compile_thread = CompileThread(src, snippet_package_dir(self.graph), graph_key,
+                                            self.plugin_settings["node_budget"],
+                                            self.plugin_settings["connection_budget"],
+                                            self.plugin_settings["line_report"], profiler, self)
+        self.compile_thread.message.connect(self.console_message)
+        self.compile_thread.progress.connect(self.statusBar().showMessage)
+        self.compile_thread.finished.connect(self.compile_finished)
+
+        self.set_compiling(True)
+        self.compile_thread.start()
+
+    def cancel_compile(self):
+        if self.compile_thread is not None:
+            self.cancel_button.setEnabled(False)
+            self.compile_thread.cancel()
+
+    def compile_finished(self):
+        compile_thread = self.compile_thread
+        self.compile_thread = None
+
+        if compile_thread.status == compile_unresolved:
+            # called or declared from an included template only, resolve it and compile again
+            graph_ids = set(compile_thread.compiler.graph_inputs)
+            if compile_thread.unresolved_graph is not None:
+                graph_ids.add(compile_thread.unresolved_graph)
+            else:
+                parser.imported_functions.resolve([compile_thread.unresolved_function])
+            self.start_compile(compile_thread.src, compile_thread.graph_key, graph_ids)
             return
-        try:
-            stripped_src = "\n".join([line.lstrip() for line in src.splitlines()])
-            ast_tree = ast.parse(stripped_src, mode="exec")
-        except SyntaxError as err:
-            self.console_message(str(err))
-            self.console_message(err.text)
+
+        if compile_thread.status == compile_up_to_date:
+            self.save_source(compile_thread.src, compile_thread.compile_key)
+        elif compile_thread.status == compile_done:
+            self.statusBar().showMessage("Updating nodes...")
+            emit_snippet(self.graph, self.frame_object, compile_thread.src, compile_thread.compile_key,
+                         compile_thread.compiled, self, compile_thread.compiler.profiler, compile_thread.graph_key)
         else:
-            self.console_message("Delete current nodes...")
-            graph_nodes = self.graph.getNodes()
-            for i in range(graph_nodes.getSize()):
-                self.graph.deleteNode(graph_nodes.getItem(i))
+            self.save_source(compile_thread.src)
 
-            self.console_message("Create nodes...")
-            self.parse_expression_tree(ast_tree)
-            if parser.nodes_num <= self.plugin_settings["align_max_nodes"]:
-                self.console_message("Align nodes...")
-                parser.align_nodes()
-            self.console_message("DONE")
+        if compile_thread.compiler.profiler is not None:
+            report_profile(compile_thread.compiler.profiler, self.graph.getIdentifier(), self, self.plugin_settings)
+
+        self.set_compiling(False)
+        self.console_message("DONE")
 
 
 class SexToolBar(QToolBar):
@@ -260,9 +647,63 @@ class SexToolBar(QToolBar):
         act.setToolTip("Open expression editor")
         act.triggered.connect(self.open_sex_window)
 
-    def open_sex_window(self):
+        act = self.addAction("Compile All")
+        act.setToolTip("Compile snippets of all function graphs in the package")
+        act.triggered.connect(self.compile_all)
+
+    def import_functions(self):
         parser.import_functions("functions.sbs", app)
         parser.import_current_graph_functions(app)
+        parser.function_index.save()
+
+    def compile_all(self):
+        self.import_functions()
+        plugin_settings = PluginSettings()
+        package = ui_mgr.getCurrentGraph().getPackage()
+        parser.import_graph_inputs(package)
+
+        snippets = []
+        for resource in package.getChildrenResources(True):
+            if isinstance(resource, sd.api.SDSBSFunctionGraph):
+                frame_object = find_snippet_frame(resource)
+                if frame_object is not None:
+                    src, _ = split_snippet(frame_object.getDescription())
+                    if src.strip():
+                        snippets.append((resource, frame_object, src))
+
+        progress = QProgressDialog("Compiling snippets...", "Cancel", 0, len(snippets), qt_mgr.getMainWindow())
+        progress.setWindowModality(Qt.WindowModal)
+        results = {compile_done: 0, compile_up_to_date: 0, compile_failed: 0}
+
+        try:
+            for snippet_index, (graph, frame_object, src) in enumerate(snippets):
+                if progress.wasCanceled():
+                    break
+
+                graph_id = graph.getIdentifier()
+                progress.setLabelText(f"Compiling {graph_id} ({snippet_index + 1}/{len(snippets)})...")
+                progress.setValue(snippet_index)
+
+                console = BatchConsole(graph_id)
+                try:
+                    status = compile_snippet(graph, frame_object, src, console, plugin_settings)
+                except Exception as err:
+                    # one broken snippet doesn't stop the others
+                    console.console_message("Unhandled exception")
+                    console.console_message(str(err))
+                    console.console_message(traceback.format_exc())
+                    status = compile_failed
+
+                results[status] += 1
+        finally:
+            progress.setValue(len(snippets))
+            parser.function_index.save()
+
+        print(f"Compile All: {results[compile_done]} compiled, {results[compile_up_to_date]} up to date, "
+              f"{results[compile_failed]} failed")
+
+    def open_sex_window(self):
+        self.import_functions()
 
         main_sd_window = qt_mgr.getMainWindow()
         graph = ui_mgr.getCurrentGraph()
@@ -272,15 +713,12 @@ class SexToolBar(QToolBar):
 
         src: str
         graph_objects = graph.getGraphObjects()
+        snippet_frame = find_snippet_frame(graph)
 
-        for i in range(graph_objects.getSize()):
-            graph_object = graph_objects.getItem(i)
-            
-            if isinstance(graph_object, sd.api.SDGraphObjectFrame):
-                graph_object: sd.api.SDGraphObjectFrame
-                src = graph_object.getDescription()
-                window.ui.code_editor.setPlainText(src)
-                window.frame_object = graph_object
+        if snippet_frame is not None:
+            src, _ = split_snippet(snippet_frame.getDescription())
+            window.ui.code_editor.setPlainText(src)
+            window.frame_object = snippet_frame
 
         if graph_objects.getSize() == 0:
             graph = ui_mgr.getCurrentGraph()
@@ -292,6 +730,8 @@ class SexToolBar(QToolBar):
             new_frame_object.setSize(sd.api.sdbasetypes.float2(sexparser.grid_size * 8, sexparser.grid_size * 20))
             window.frame_object = new_frame_object
 
+        window.check_snippet_state()
+
 def onNewGraphViewCreated(graph_view_id, qt_ui_mgr: sd.api.qtforpythonuimgrwrapper.QtForPythonUIMgrWrapper):
     # Create our toolbar.
     toolbar = SexToolBar(graph_view_id, qt_ui_mgr)
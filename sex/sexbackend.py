@@ -0,0 +1,176 @@
+from sexdiff import GraphState, NodeRecord
+
+
+class GraphBackend:
+    """Operations the emitter performs on a function graph.
+
+    Nodes are opaque handles owned by the backend. [grid_size] is the distance
+    between neighbouring nodes in graph coordinates. [api_calls] is the running number
+    of calls the backend made to the underlying graph API.
+    """
+
+    grid_size = 1.0
+    api_calls = 0
+
+    def read_state(self) -> GraphState:
+        raise NotImplementedError
+
+    def state_key(self):
+        """Key the state of the graph is kept by between emits (None if it can't be kept)"""
+        return None
+
+    def state_matches(self, state: GraphState) -> bool:
+        """Cheap check that the graph still looks like [state] kept from the last emit"""
+        return False
+
+    def read_positions(self, node_ids) -> dict:
+        """{id: (x, y)} of nodes [node_ids]"""
+        raise NotImplementedError
+
+    def get_node(self, node_id):
+        raise NotImplementedError
+
+    def node_id(self, node):
+        raise NotImplementedError
+
+    def function_kind(self, function: str, resource) -> str:
+        """Node kind (as reported by read_state) of an instance of imported [function]"""
+        raise NotImplementedError
+
+    def new_node(self, definition: str):
+        raise NotImplementedError
+
+    def new_instance_node(self, function: str, resource):
+        raise NotImplementedError
+
+    def delete_node(self, node):
+        raise NotImplementedError
+
+    def set_constant(self, node, constant: tuple):
+        raise NotImplementedError
+
+    def connect(self, source_node, node, input_name: str):
+        raise NotImplementedError
+
+    def get_output_node(self):
+        raise NotImplementedError
+
+    def set_output_node(self, node):
+        raise NotImplementedError
+
+    def set_position(self, node, x: float, y: float):
+        raise NotImplementedError
+
+
+class MemoryNode:
+    __slots__ = ("id", "kind", "constant", "inputs", "consumers", "position")
+
+    def __init__(self, node_id: int, kind: str):
+        self.id = node_id
+        self.kind = kind
+        self.constant = None
+        self.inputs = {}
+        self.consumers = set()
+        self.position = (0.0, 0.0)
+
+    def __repr__(self):
+        return f"MemoryNode({self.id}, {self.kind})"
+
+
+class MemoryGraphBackend(GraphBackend):
+    """Plain Python graph store with the semantics of SD function graph.
+
+    Counts every call in [calls] ({operation name: count}) to compare emission strategies.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.output = None
+        self.calls = {}
+        self._next_id = 0
+
+    def _count(self, operation: str):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        self.api_calls += 1
+
+    def _add_node(self, kind: str) -> MemoryNode:
+        node = MemoryNode(self._next_id, kind)
+        self.nodes[node.id] = node
+        self._next_id += 1
+        return node
+
+    def read_state(self) -> GraphState:
+        self._count("read_state")
+        records = [NodeRecord(n.id, n.kind, n.constant, {name: src.id for name, src in n.inputs.items()})
+                   for n in self.nodes.values()]
+        return GraphState(records, self.output.id if self.output is not None else None)
+
+    def state_key(self):
+        return id(self)
+
+    def state_matches(self, state: GraphState) -> bool:
+        self._count("state_matches")
+        return len(self.nodes) == len(state.records) and state.output == (self.output.id if self.output else None)
+
+    def read_positions(self, node_ids) -> dict:
+        positions = {}
+        for node_id in node_ids:
+            # SD reads positions node by node
+            self._count("read_position")
+            positions[node_id] = self.nodes[node_id].position
+        return positions
+
+    def get_node(self, node_id) -> MemoryNode:
+        return self.nodes[node_id]
+
+    def node_id(self, node: MemoryNode):
+        return node.id
+
+    def function_kind(self, function: str, resource) -> str:
+        return resource if resource is not None else function
+
+    def new_node(self, definition: str) -> MemoryNode:
+        self._count("new_node")
+        return self._add_node(definition)
+
+    def new_instance_node(self, function: str, resource) -> MemoryNode:
+        self._count("new_instance_node")
+        return self._add_node(self.function_kind(function, resource))
+
+    def delete_node(self, node: MemoryNode):
+        self._count("delete_node")
+        del self.nodes[node.id]
+
+        # deleting a node removes its connections as well
+        for consumer, input_name in node.consumers:
+            del consumer.inputs[input_name]
+
+        for input_name, source_node in node.inputs.items():
+            source_node.consumers.discard((node, input_name))
+
+        if self.output is node:
+            self.output = None
+
+    def set_constant(self, node: MemoryNode, constant: tuple):
+        self._count("set_constant")
+        node.constant = constant
+
+    def connect(self, source_node: MemoryNode, node: MemoryNode, input_name: str):
+        self._count("connect")
+        previous_node = node.inputs.get(input_name)
+        if previous_node is not None:
+            previous_node.consumers.discard((node, input_name))
+
+        node.inputs[input_name] = source_node
+        source_node.consumers.add((node, input_name))
+
+    def get_output_node(self) -> MemoryNode:
+        return self.output
+
+    def set_output_node(self, node: MemoryNode):
+        self._count("set_output_node")
+        self.output = node
+
+    def set_position(self, node: MemoryNode, x: float, y: float):
+        self._count("set_position")
+        node.position = (x, y)
@@ -0,0 +1,125 @@
+"""Compile .sex snippets without Substance Designer.
+
+    python sexcli.py snippet.sex [--package-dir DIR] [--signatures FILE] [--sbs PACKAGE] [--emit] [--profile TRACE] [-o OUTPUT]
+
+Writes the portable graph description and compile statistics as JSON.
+With --sbs the graph is written as a function of .sbs package SD can load directly.
+With --emit the graph is also emitted into the in-memory backend to measure emission separately from SD.
+With --lines N the snippet lines producing most of the nodes are printed.
+With --profile the time of every compile phase is printed and written as JSON trace.
+
+For a directory every .sex file in it is compiled in a process pool into .json files (next to
+the sources or under -o directory). Results are cached on disk until the source or templates
+it includes change and --watch keeps recompiling changed sources.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import jinja2
+import sexcompiler
+import sexfarm
+from sexbackend import MemoryGraphBackend
+from sexemit import GraphEmitter
+from sexprofile import Profiler
+from sexreport import line_report
+from sexsbs import SbsWriter, function_inputs
+
+
+def main(argv: list = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Compile .sex snippet into a function graph description")
+    arg_parser.add_argument("source", help=".sex source file or directory of them")
+    arg_parser.add_argument("--package-dir", help="directory for jinja includes (the source directory by default)")
+    arg_parser.add_argument("--signatures", help="JSON file with imported function signatures and graph inputs")
+    arg_parser.add_argument("--emit", action="store_true", help="emit the graph into in-memory backend and report its cost")
+    arg_parser.add_argument("--sbs", help="write the graph as a function of .sbs package")
+    arg_parser.add_argument("--lines", type=int, default=0, help="print this many lines producing most of the nodes")
+    arg_parser.add_argument("--profile", help="print compile phases timing and write it to this JSON file")
+    arg_parser.add_argument("-o", "--output", help="output JSON file (stdout by default) or directory for a source directory")
+    arg_parser.add_argument("--jobs", type=int, help="number of compile processes for a source directory (CPU count by default)")
+    arg_parser.add_argument("--cache-dir", help="compile cache directory for a source directory (.sexcache in the output directory by default)")
+    arg_parser.add_argument("--watch", action="store_true", help="keep recompiling changed sources of a source directory")
+    arg_parser.add_argument("--interval", type=float, default=1.0, help="watch polling interval in seconds")
+    args = arg_parser.parse_args(argv)
+
+    is_directory = os.path.isdir(args.source)
+    if is_directory and (args.sbs or args.emit or args.profile or args.lines):
+        arg_parser.error("--sbs, --emit, --profile and --lines are supported for a single source file only")
+    if not is_directory and args.watch:
+        arg_parser.error("--watch is supported for a source directory only")
+
+    signatures = None
+    if args.signatures:
+        with open(args.signatures) as signatures_file:
+            signatures = json.load(signatures_file)
+
+    if is_directory:
+        return sexfarm.run_farm(args.source, args.output, args.package_dir, signatures,
+                                args.jobs, args.cache_dir, args.watch, args.interval)
+
+    compiler = GraphEmitter(MemoryGraphBackend()) if args.emit else sexcompiler.Compiler()
+    if args.profile:
+        compiler.profiler = Profiler()
+
+    try:
+        result = sexcompiler.compile_file(args.source, args.package_dir, signatures, compiler)
+    except (sexcompiler.ParserError, SyntaxError, jinja2.TemplateError) as err:
+        print(f"{args.source}: {err}", file=sys.stderr)
+        return 1
+
+    if args.sbs:
+        function_urls = {name: function[0] for name, function in compiler.imported_functions.items() if function[0]}
+        dependencies = signatures.get("dependencies") if signatures else None
+        start_time = time.perf_counter()
+
+        writer = SbsWriter(function_urls, dependencies)
+        graph_id = os.path.splitext(os.path.basename(args.source))[0]
+        try:
+            with compiler.profile("sbs"):
+                inputs = function_inputs(compiler.ir_graph, compiler.get_graph_inputs(graph_id), compiler.set_variables)
+                writer.add_function(graph_id, compiler.ir_graph, inputs)
+                writer.write(args.sbs)
+        except ValueError as err:
+            print(f"{args.source}: {err}", file=sys.stderr)
+            return 1
+
+        result["stats"]["sbs_time"] = time.perf_counter() - start_time
+
+    if args.emit:
+        start_time = time.perf_counter()
+        with compiler.profile("emit"):
+            compiler.emit_graph(compiler.ir_graph)
+        result["stats"]["emit_time"] = time.perf_counter() - start_time
+        result["stats"]["backend_calls"] = compiler.backend.calls
+
+    for message in result["messages"]:
+        print(message, file=sys.stderr)
+
+    if args.lines > 0:
+        with open(args.source) as source_file:
+            src = source_file.read()
+        for line in line_report(compiler.ir_graph, src, result["source_lines"], args.lines):
+            print(line, file=sys.stderr)
+
+    if args.profile:
+        for line in compiler.profiler.summary():
+            print(line, file=sys.stderr)
+        compiler.profiler.write(args.profile)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(result, output_file, indent=4)
+    else:
+        json.dump(result, sys.stdout, indent=4)
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
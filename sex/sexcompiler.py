@@ -0,0 +1,957 @@
+import ast
+import bisect
+import hashlib
+import os
+import re
+import time
+
+from contextlib import nullcontext
+
+import jinja2
+from jinja2 import nodes as jinja_nodes
+from jinja2.compiler import CodeGenerator
+
+from sexfold import fold_constants
+from sexir import IRGraph, IRNode
+from sexsimplify import simplify_node
+from sextypes import TypeCheckError, check_signature, function_signature, infer_type
+
+# bump whenever the compiler output changes for the same source
+compiler_version = "1"
+
+no_profile = nullcontext()
+
+# number of lines listed when the graph is over the budget
+budget_report_lines = 10
+
+# names of a source searched for calls of imported functions
+identifier_pattern = re.compile(r"[A-Za-z_]\w*")
+
+output_variable_name = "_OUT_"
+export_function_name = "export"
+setvar_function_name = "setvar"
+sequence_function_name = "sequence"
+declare_inputs_function_name = "declare_inputs"
+
+# graph ids passed to declare_inputs()
+declared_graph_pattern = re.compile(declare_inputs_function_name + r"\s*\(\s*(['\"])(.*?)\1")
+
+binary_operator_map = {
+    ast.Add: "sbs::function::add",
+    ast.Sub: "sbs::function::sub",
+    ast.Mult: "sbs::function::mul",
+    ast.Div: "sbs::function::div",
+    ast.Mod: "sbs::function::mod",
+    ast.MatMult: "sbs::function::mulscalar",
+    ast.BitXor: "sbs::function::dot"
+}
+
+unary_operator_map = {
+    ast.Not: "sbs::function::not",
+    ast.USub: "sbs::function::neg"
+}
+
+bool_operator_map = {
+    ast.And: "sbs::function::and",
+    ast.Or: "sbs::function::or"
+}
+
+compare_operator_map = {
+    ast.Gt: "sbs::function::gt",
+    ast.GtE: "sbs::function::gteq",
+    ast.Lt: "sbs::function::lr",
+    ast.LtE: "sbs::function::lreq",
+    ast.Eq: "sbs::function::eq",
+    ast.NotEq: "sbs::function::noteq",
+}
+
+# how operators without a node are shown in errors
+operator_symbols = {
+    ast.Pow: "**",
+    ast.FloorDiv: "//",
+    ast.LShift: "<<",
+    ast.RShift: ">>",
+    ast.BitOr: "|",
+    ast.BitAnd: "&",
+    ast.Invert: "~",
+    ast.UAdd: "unary +",
+    ast.Is: "is",
+    ast.IsNot: "is not",
+    ast.In: "in",
+    ast.NotIn: "not in",
+}
+
+samplers_map = {
+    "samplelum": "sbs::function::samplelum",
+    "samplecol": "sbs::function::samplecol",
+}
+
+function_node_map = {
+    "abs": ("sbs::function::abs", ["a"]),
+    "floor": ("sbs::function::floor", ["a"]),
+    "ceil": ("sbs::function::ceil", ["a"]),
+    "cos": ("sbs::function::cos", ["a"]),
+    "sin": ("sbs::function::sin", ["a"]),
+    "tan": ("sbs::function::tan", ["a"]),
+    "atan2": ("sbs::function::atan2", ["a"]),
+    "cartesian": ("sbs::function::cartesian", ["rho", "theta"]),
+    "sqrt": ("sbs::function::sqrt", ["a"]),
+    "log": ("sbs::function::log", ["a"]),
+    "exp": ("sbs::function::exp", ["a"]),
+    "log2": ("sbs::function::log2", ["a"]),
+    "pow2": ("sbs::function::pow2", ["a"]),
+    "lerp": ("sbs::function::lerp", ["a", "b", "x"]),
+    "min": ("sbs::function::min", ["a", "b"]),
+    "max": ("sbs::function::max", ["a", "b"]),
+    "rand": ("sbs::function::rand", ["a"]),
+    "dot": ("sbs::function::dot", ["a", "b"]),
+}
+
+constants_map = {
+    "float" : "sbs::function::const_float1",
+    "float2" : "sbs::function::const_float2",
+    "float3" : "sbs::function::const_float3",
+    "float4" : "sbs::function::const_float4",
+    "int" : "sbs::function::const_int1",
+    "int2" : "sbs::function::const_int2",
+    "int3" : "sbs::function::const_int3",
+    "int4" : "sbs::function::const_int4"
+}
+
+constant_node_definitions = dict(constants_map, bool="sbs::function::const_bool")
+
+vectors_map = {
+    "vector2" : "sbs::function::vector2",
+    "vector3" : "sbs::function::vector3",
+    "vector4" : "sbs::function::vector4",
+    "ivector2" : "sbs::function::ivector2",
+    "ivector3" : "sbs::function::ivector3",
+    "ivector4" : "sbs::function::ivector4"
+}
+
+get_variable_map = {
+    "get_float" : "sbs::function::get_float1",
+    "get_float2" : "sbs::function::get_float2",
+    "get_float3" : "sbs::function::get_float3",
+    "get_float4" : "sbs::function::get_float4",
+    "get_int" : "sbs::function::get_integer1",
+    "get_int2" : "sbs::function::get_integer2",
+    "get_int3" : "sbs::function::get_integer3",
+    "get_int4" : "sbs::function::get_integer4",
+    "get_bool" : "sbs::function::get_bool",
+    "get_string" : "sbs::function::get_string"
+}
+
+casts_map = {
+    "tofloat" : "sbs::function::tofloat",
+    "tofloat2" : "sbs::function::tofloat2",
+    "tofloat3" : "sbs::function::tofloat3",
+    "tofloat4" : "sbs::function::tofloat4",
+    "toint" : "sbs::function::toint1",
+    "toint2" : "sbs::function::toint2",
+    "toint3" : "sbs::function::toint3",
+    "toint4" : "sbs::function::toint4"
+}
+
+float_components_map = {
+    "x" : 0,
+    "y" : 1,
+    "z" : 2,
+    "w" : 3
+}
+
+int_components_map = {
+    "a" : 0,
+    "b" : 1,
+    "c" : 2,
+    "d" : 3
+}
+
+# nodes with side effects or per-node state are never merged
+non_mergeable_definitions = {
+    "sbs::function::set",
+    "sbs::function::sequence",
+    "sbs::function::rand"
+}
+
+# nodes setting variables: simplification never drops them (nor anything consuming them)
+side_effect_definitions = {
+    "sbs::function::set"
+}
+
+# get nodes of variables the snippet sets aren't merged either: each one reads the value set before it
+variable_get_definitions = set(get_variable_map.values())
+
+integer_vector_types = {
+    1 : "int",
+    2 : "int2",
+    3 : "int3",
+    4 : "int4"
+}
+
+# get variable node for every input type id
+variable_node_map = {
+    "float" : "sbs::function::get_float1",
+    "float2" : "sbs::function::get_float2",
+    "float3" : "sbs::function::get_float3",
+    "float4" : "sbs::function::get_float4",
+    "int" : "sbs::function::get_integer1",
+    "int2" : "sbs::function::get_integer2",
+    "int3" : "sbs::function::get_integer3",
+    "int4" : "sbs::function::get_integer4",
+    "bool" : "sbs::function::get_bool",
+    "string" : "sbs::function::get_string"
+}
+
+def set_variable_names(expr_tree: ast.AST) -> set:
+    """Names of all variables set by setvar() or export() calls in [expr_tree]"""
+    names = set()
+    for node in ast.walk(expr_tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.args:
+            if node.func.id == setvar_function_name and isinstance(node.args[0], ast.Str):
+                names.add(node.args[0].s)
+            elif node.func.id == export_function_name and isinstance(node.args[0], ast.Name):
+                names.add(node.args[0].id)
+    return names
+
+
+def vector_value(components: list):
+    return components[0] if len(components) == 1 else tuple(components)
+
+class ParserError(Exception):
+    pass
+
+
+jinja_environments = {}
+
+
+class LineCodeGenerator(CodeGenerator):
+    """Template code generator mapping every output statement to the template line it starts at.
+
+    The default one records lines of the first statement only so output following a tag
+    would be attributed to the tag line. Every child is written as its own output as well:
+    text around a comment is otherwise joined into one chunk losing the lines of the comment.
+    """
+
+    def visit_Output(self, node, frame):
+        for child in node.nodes:
+            self.newline(child)
+            super().visit_Output(jinja_nodes.Output([child], lineno=child.lineno), frame)
+
+
+def new_jinja_environment(loader: jinja2.BaseLoader) -> jinja2.Environment:
+    jenv = jinja2.Environment(loader=loader)
+    jenv.code_generator_class = LineCodeGenerator
+
+    jenv.lstrip_blocks = True
+    jenv.trim_blocks = True
+    jenv.line_statement_prefix = "::"
+
+    return jenv
+
+
+def jinja_environment(package_dir: str) -> jinja2.Environment:
+    """Shared environment per package directory so included templates are loaded once (and reloaded when changed)"""
+    jenv = jinja_environments.get(package_dir)
+    if jenv is None:
+        jenv = new_jinja_environment(jinja2.FileSystemLoader(package_dir))
+        jinja_environments[package_dir] = jenv
+
+    return jenv
+
+
+def render_source(src: str, package_dir: str, jenv: jinja2.Environment = None) -> str:
+    """Render jinja template [src] (includes are looked up in [package_dir]) and strip indentation.
+
+    The shared environment of [package_dir] is used unless [jenv] is given.
+    """
+    if jenv is None:
+        jenv = jinja_environment(package_dir)
+
+    rendered_src = jenv.from_string(src).render()
+    return "\n".join([line.lstrip() for line in rendered_src.splitlines()])
+
+
+def render_source_lines(src: str, package_dir: str, jenv: jinja2.Environment = None) -> tuple:
+    """render_source() that also finds the line of [src] every rendered line comes from.
+
+    Returns (rendered source, [snippet line for each rendered line]). Lines written by macros
+    and included templates are attributed to the snippet line calling them.
+    """
+    if jenv is None:
+        jenv = jinja_environment(package_dir)
+
+    template = jenv.from_string(src)
+    chunks = []
+    chunk_offsets = []
+    chunk_lines = []
+    template_lines = {}
+    offset = 0
+
+    # the same generator render() joins, suspended at the yield of every chunk
+    try:
+        render_func = template.root_render_func(template.new_context())
+        static_chunks = {id(const) for const in render_func.gi_code.co_consts if isinstance(const, str)}
+
+        for chunk in render_func:
+            code_line = render_func.gi_frame.f_lineno
+            template_line = template_lines.get(code_line)
+            if template_line is None:
+                template_line = template_lines[code_line] = template.get_corresponding_lineno(code_line)
+
+            chunks.append(chunk)
+            chunk_offsets.append(offset)
+            # static text keeps its own line breaks, everything else comes from the line of the tag
+            chunk_lines.append((template_line, id(chunk) in static_chunks))
+            offset += len(chunk)
+    except Exception:
+        jenv.handle_exception()
+
+    rendered_src = "".join(chunks)
+    source_lines = []
+    line_offset = 0
+
+    for line in rendered_src.splitlines(True):
+        # the line belongs to the chunk of its first meaningful character
+        text_offset = min(line_offset + len(line) - len(line.lstrip()), offset - 1)
+        chunk_index = bisect.bisect_right(chunk_offsets, text_offset) - 1
+        template_line, is_static = chunk_lines[chunk_index]
+
+        if is_static:
+            chunk_offset = chunk_offsets[chunk_index]
+            template_line += rendered_src.count("\n", chunk_offset, text_offset)
+
+        source_lines.append(template_line)
+        line_offset += len(line)
+
+    return "\n".join([line.lstrip() for line in rendered_src.splitlines()]), source_lines
+
+
+class Compiler:
+    """Compiles snippet source into IRGraph without any access to Substance Designer.
+
+    [imported_functions] maps function names to (resource, input ids, signature) where
+    resource is whatever the graph backend needs to instantiate the function (None when headless).
+    Only functions the snippet calls are looked up so it can be a lazy mapping such as sexindex.FunctionTable.
+    [graph_inputs] maps graph ids to [(input id, type id)] for declare_inputs().
+    Phases are timed by sexprofile.Profiler [profiler] if it's set.
+    """
+
+    def __init__(self):
+        self.var_scope = {}
+        self.var_declare_line = {}
+        self.used_vars = set()
+        self.unused_vars = []
+        self.inputs_vars = []
+        self.export_vars = []
+        self.set_variables = set()
+        self.imported_functions = {}
+        self.graph_inputs = {}
+        self.profiler = None
+        self.ir_graph = IRGraph()
+        self.messages = []
+        self.keywords = []
+        self.keywords += function_node_map.keys()
+        self.keywords += constants_map.keys()
+        self.keywords += vectors_map.keys()
+        self.keywords += get_variable_map.keys()
+        self.keywords += casts_map.keys()
+        self.keywords += samplers_map.keys()
+        self.keywords.append(output_variable_name)
+        self.keywords.append(export_function_name)
+        self.keywords.append(declare_inputs_function_name)
+        self.keywords.append("True")
+        self.keywords.append("False")
+
+    def _reset(self):
+        self.var_scope = {}
+        self.var_declare_line = {}
+        self.used_vars = set()
+        self.unused_vars = []
+        self.export_vars = []
+        self.set_variables = set()
+        self.ir_graph = IRGraph()
+        self.messages = []
+
+    def _error(self, message: str, operator: ast.Expr):
+        lineno = getattr(operator, "lineno", 0)
+        col_offset = getattr(operator, "col_offset", 0)
+        raise ParserError(f"[line {lineno}: col {col_offset}] ERROR: {message}")
+
+    def unsupported_operator(self, op: ast.AST, operator: ast.expr):
+        self._error(f"Operator {operator_symbols.get(type(op), type(op).__name__)} is not supported", operator)
+
+    def message(self, text: str):
+        self.messages.append(text)
+
+    def profile(self, phase: str):
+        """Context timing [phase] in the profiler (does nothing without it)"""
+        if self.profiler is None:
+            return no_profile
+        return self.profiler.phase(phase)
+
+    def get_graph_inputs(self, graph_id: str) -> list:
+        """Inputs of graph [graph_id] as [(input id, type id)] or None if there's no such graph"""
+        return self.graph_inputs.get(graph_id)
+
+    def declare_inputs(self, graph_id: str, operator: ast.Call):
+        inputs = self.get_graph_inputs(graph_id)
+        if inputs is None:
+            return False
+
+        for prop_id, prop_type in inputs:
+            if prop_type in variable_node_map and prop_id[0] != "$":
+                input_node = self.create_node(variable_node_map[prop_type], operator,
+                                              constant=("string", prop_id), node_type=prop_type)
+                self.var_scope[prop_id] = input_node
+                self.inputs_vars.append(prop_id)
+
+        return True
+
+    def create_node(self, node_definition: str, operator: ast.expr, inputs: dict = None,
+                    constant: tuple = None, function: str = None, node_type: str = None) -> IRNode:
+        if node_type is None:
+            with self.profile("type_check"):
+                node_type = self.infer_node_type(node_definition, function, inputs, operator)
+
+        if inputs:
+            input_constants = {name: n.constant if self.is_constant_node(n) else None for name, n in inputs.items()}
+
+            if all(c is not None for c in input_constants.values()):
+                folded_constant = fold_constants(node_definition, constant, input_constants)
+                if folded_constant is not None:
+                    self.ir_graph.folded_nodes_num += 1
+                    return self.create_constant_node(*folded_constant, operator)
+
+            simplified = simplify_node(node_definition, node_type, inputs, input_constants)
+            if simplified is not None:
+                self.ir_graph.simplified_nodes_num += 1
+                if isinstance(simplified, IRNode):
+                    return simplified
+                return self.create_constant_node(*simplified, operator)
+
+        return self.ir_graph.add_node(node_definition, inputs, constant, function, node_type,
+                                      getattr(operator, "lineno", 0), getattr(operator, "col_offset", 0),
+                                      mergeable=self.is_mergeable(node_definition, constant, function),
+                                      side_effects=function is not None or node_definition in side_effect_definitions)
+
+    def is_mergeable(self, node_definition: str, constant: tuple, function: str) -> bool:
+        """Whether identical nodes can be shared. Instances of imported functions aren't merged
+        as their bodies can set variables or call rand()"""
+        if function is not None or node_definition in non_mergeable_definitions:
+            return False
+        if node_definition in variable_get_definitions and constant is not None:
+            return constant[1] not in self.set_variables
+        return True
+
+    def infer_node_type(self, node_definition: str, function: str, inputs: dict, operator: ast.expr) -> str:
+        input_types = {name: n.type for name, n in inputs.items()} if inputs else {}
+        try:
+            if function is not None:
+                return check_signature(self.imported_functions[function][2], input_types)
+            return infer_type(node_definition, input_types)
+        except TypeCheckError as err:
+            self._error(str(err), operator)
+
+    def create_constant_node(self, constant_type: str, value, operator: ast.expr) -> IRNode:
+        return self.ir_graph.add_constant(constant_node_definitions[constant_type], (constant_type, value),
+                                          getattr(operator, "lineno", 0), getattr(operator, "col_offset", 0))
+
+    def is_constant_node(self, node: IRNode) -> bool:
+        return node is not None and node.function is None and node.definition in constant_node_definitions.values()
+
+    def parse_swizzling(self, operator: ast.Attribute, vector_node: IRNode) -> IRNode:
+        num_components = len(operator.attr)
+        if num_components > 4:
+            self._error(f"Swizzling supports up to 4 components ({num_components} given: .{operator.attr})", operator)
+
+        float_components_found = all((c in float_components_map.keys()) for c in operator.attr)
+        int_components_found = all((c in int_components_map.keys()) for c in operator.attr)
+
+        if not float_components_found and not int_components_found:
+            self._error(f"Unsupported components in swizzling (.{operator.attr})", operator)
+
+        if float_components_found:
+            components_mask = [float_components_map[c] for c in operator.attr]
+            return self.create_node(f"sbs::function::swizzle{num_components}", operator, {"vector": vector_node},
+                                    constant=(integer_vector_types[num_components], vector_value(components_mask)))
+
+        if int_components_found:
+            components_mask = [int_components_map[c] for c in operator.attr]
+            return self.create_node(f"sbs::function::iswizzle{num_components}", operator, {"vector": vector_node},
+                                    constant=(integer_vector_types[num_components], vector_value(components_mask)))
+
+    def parse_vector(self, operator: ast.Call) -> IRNode:
+        func_arguments = operator.args
+        if len(func_arguments) != 2:
+            self._error("Vector takes only two arguments", operator)
+        vector_type = vectors_map[operator.func.id]
+
+        in_node = self.parse_operator(func_arguments[0])
+        last_node = self.parse_operator(func_arguments[1])
+
+        return self.create_node(vector_type, operator, {"componentsin": in_node, "componentslast": last_node})
+    
+
+    def parse_value_cast(self, operator: ast.Call) -> IRNode:
+        func_arguments = operator.args
+        if len(func_arguments) != 1:
+            self._error(f"{operator.func.id}() takes only one argument ({len(func_arguments)} given)", operator)
+        
+        value_argument = func_arguments[0]
+        value_node = self.parse_operator(value_argument)
+
+        return self.create_node(casts_map[operator.func.id], operator, {"value": value_node})
+
+    def parse_get_variable(self, operator: ast.Call) -> IRNode:
+        func_arguments = operator.args
+
+        if len(func_arguments) != 1:
+            self._error("get_variable() has only one srting argument", operator)
+
+        if not isinstance(func_arguments[0], ast.Str):
+            self._error("get_variable() argument has to be string", operator)
+
+        arg: ast.Str = func_arguments[0]
+        return self.create_node(get_variable_map[operator.func.id], operator, constant=("string", arg.s))
+
+    def parse_constant(self, operator: ast.Call) -> IRNode:
+        constant_type = operator.func.id
+        constant_node_definition = constants_map[constant_type]
+
+        num_components = int(constant_node_definition[-1:])
+        func_arguments = operator.args
+
+        arg_values = []
+
+        if num_components != len(func_arguments):
+            self._error(f"{constant_type}() takes {num_components} arguments ({len(func_arguments)} given)", operator)
+        else:
+            for arg in func_arguments:
+                if not isinstance(arg, ast.Num):
+                    self._error(f"{constant_type}() takes only const arguments", operator)
+                else:
+                    arg: ast.Num
+                    arg_values.append(arg.n)
+
+        constant_value = vector_value([float(v) if constant_type.startswith("float") else int(v) for v in arg_values])
+        return self.create_constant_node(constant_type, constant_value, operator)
+
+    def parse_binary_operator(self, operator: ast.BinOp) -> IRNode:
+        if type(operator.op) not in binary_operator_map:
+            self.unsupported_operator(operator.op, operator)
+
+        left_node = self.parse_operator(operator.left)
+        right_node = self.parse_operator(operator.right)
+
+        right_input = "b"
+        if isinstance(operator.op, ast.MatMult):
+            right_input = "scalar"
+
+        return self.create_node(binary_operator_map[type(operator.op)], operator, {"a": left_node, right_input: right_node})
+
+    def parse_unary_operator(self, operator: ast.UnaryOp) -> IRNode:
+        if type(operator.op) not in unary_operator_map:
+            self.unsupported_operator(operator.op, operator)
+
+        operand_node = self.parse_operator(operator.operand)
+
+        return self.create_node(unary_operator_map[type(operator.op)], operator, {"a": operand_node})
+
+    def parse_boolean_operator(self, operator: ast.BoolOp) -> IRNode:
+        if type(operator.op) not in bool_operator_map:
+            self.unsupported_operator(operator.op, operator)
+
+        operands = operator.values
+
+        left_node = self.parse_operator(operands[0])
+        right_node = self.parse_operator(operands[1])
+
+        node = self.create_node(bool_operator_map[type(operator.op)], operator, {"a": left_node, "b": right_node})
+
+        if len(operands) > 2:
+            prev_node = node
+
+            for opi in range(2, len(operands)):
+                operand_node = self.parse_operator(operands[opi])
+                node = self.create_node(bool_operator_map[type(operator.op)], operator, {"a": prev_node, "b": operand_node})
+
+                prev_node = node
+
+        return node
+
+    def parse_ifexpr(self, operator: ast.IfExp) -> IRNode:
+        body_node = self.parse_operator(operator.body)
+        test_node = self.parse_operator(operator.test)
+        orelse_node = self.parse_operator(operator.orelse)
+
+        return self.create_node("sbs::function::ifelse", operator,
+                                {"ifpath": body_node, "condition": test_node, "elsepath": orelse_node})
+
+    def parse_compare_operator(self, operator: ast.Compare) -> IRNode:
+        if len(operator.ops) != 1:
+            self._error("Non binary comparisons are not supported", operator)
+
+        if type(operator.ops[0]) not in compare_operator_map:
+            self.unsupported_operator(operator.ops[0], operator)
+
+        left_node = self.parse_operator(operator.left)
+        right_node = self.parse_operator(operator.comparators[0])
+
+        return self.create_node(compare_operator_map[type(operator.ops[0])], operator, {"a": left_node, "b": right_node})
+
+    def parse_sampler(self, operator: ast.Call) -> IRNode:
+        function_name = operator.func.id
+
+        if len(operator.args) != 3:
+            self._error(f"{function_name}() takes 3 arguments ({len(operator.args)} given)", operator)
+        
+        pos_node = self.parse_operator(operator.args[0])
+
+        input_image_arg = operator.args[1]
+        filter_image_arg = operator.args[2]
+
+        if not isinstance(input_image_arg, ast.Num) or not isinstance(filter_image_arg, ast.Num):
+            self._error(f"{function_name}() takes only constants for input image or filter", operator)
+
+        return self.create_node(samplers_map[function_name], operator, {"pos": pos_node},
+                                constant=("int2", (input_image_arg.n, filter_image_arg.n)))
+
+    def parse_function_node(self, operator: ast.Call) -> IRNode:
+        function_name = operator.func.id
+
+        function_sd_definition, input_names = function_node_map[function_name]
+        
+        if len(operator.args) != len(input_names):
+            self._error(f"{function_name}() takes {len(input_names)} arguments ({len(operator.args)} given)", operator)
+
+        inputs = {}
+        for arg, input_name in zip(operator.args, input_names):
+            inputs[input_name] = self.parse_operator(arg)
+
+        return self.create_node(function_sd_definition, operator, inputs)
+
+    def parse_imported_function(self, operator: ast.Call) -> IRNode:
+        sd_resource, inputs_list, _ = self.imported_functions[operator.func.id]
+
+        if len(operator.args) != len(inputs_list):
+            self._error(f"{operator.func.id}() takes {len(inputs_list)} arguments ({len(operator.args)} given)", operator)
+
+        inputs = {}
+        for arg, input_name in zip(operator.args, inputs_list):
+            inputs[input_name] = self.parse_operator(arg)
+
+        return self.create_node(None, operator, inputs, function=operator.func.id)
+
+    def parse_operator(self, operator) -> IRNode:
+        if isinstance(operator, ast.BinOp):
+            return self.parse_binary_operator(operator)
+
+        if isinstance(operator, ast.UnaryOp):
+            return self.parse_unary_operator(operator)
+
+        if isinstance(operator, ast.Compare):
+            return self.parse_compare_operator(operator)
+
+        if isinstance(operator, ast.BoolOp):
+            return self.parse_boolean_operator(operator)
+
+        if isinstance(operator, ast.IfExp):
+            return self.parse_ifexpr(operator)
+                
+        if isinstance(operator, ast.Num):
+            operator: ast.Num
+            value = operator.n
+
+            if isinstance(value, int):
+                return self.create_constant_node("int", value, operator)
+        
+            if isinstance(value, float):
+                return self.create_constant_node("float", value, operator)
+
+        if isinstance(operator, ast.Attribute):
+            operator: ast.Attribute
+            if isinstance(operator.ctx, ast.Store):
+                self._error("Assigning to attributes is not supported", operator)
+            name_node = self.parse_operator(operator.value)
+            return self.parse_swizzling(operator, name_node)
+        
+        if isinstance(operator, ast.Name):
+            operator: ast.Name
+            variable_name = operator.id
+
+            if variable_name in self.var_scope:
+                self.used_vars.add(variable_name)
+                return self.var_scope[variable_name]
+            else:
+                self._error(f"Variable [{variable_name}] not found", operator)
+
+        if isinstance(operator, ast.NameConstant):
+            operator: ast.NameConstant
+            value = operator.value
+            if value == True or value == False:
+                return self.create_constant_node("bool", value, operator)
+      
+        if isinstance(operator, ast.Call):
+            operator: ast.Call
+            function_name = operator.func.id
+
+            if function_name in constants_map:
+                return self.parse_constant(operator)
+
+            if function_name in vectors_map:
+                return self.parse_vector(operator)
+
+            if function_name in get_variable_map:
+                return self.parse_get_variable(operator)
+
+            if function_name in samplers_map:
+                return self.parse_sampler(operator)
+
+            if function_name in function_node_map:
+                return self.parse_function_node(operator)
+
+            if function_name in casts_map:
+                return self.parse_value_cast(operator)
+
+            if function_name in self.imported_functions:
+                return self.parse_imported_function(operator)
+
+            if function_name == export_function_name:
+                function_args = operator.args
+
+                if len(function_args) != 1:
+                    self._error(f"{export_function_name}() takes exactly one argument ({len(function_args)} given)", operator)
+
+                if not isinstance(function_args[0], ast.Name):
+                    self._error(f"{export_function_name}() takes only variables", operator)
+
+                node_to_export = self.parse_operator(function_args[0])
+                var_arg: ast.Name = function_args[0]
+
+                node = self.create_node("sbs::function::set", operator, {"value": node_to_export}, constant=("string", var_arg.id))
+
+                self.export_vars.append(node)
+
+                return node
+            
+            if function_name == declare_inputs_function_name:
+                func_arguments = operator.args
+
+                if len(func_arguments) != 1:
+                    self._error(f"{declare_inputs_function_name}() has only one srting argument", operator)
+
+                if not isinstance(func_arguments[0], ast.Str):
+                    self._error(f"{declare_inputs_function_name}() argument has to be string", operator)
+
+                arg: ast.Str = func_arguments[0]
+
+                if not self.declare_inputs(arg.s, operator):
+                    self._error(f"Graph [{arg.s}] not found for {declare_inputs_function_name}()", operator)
+
+                return None
+
+            if function_name == setvar_function_name:
+                function_args = operator.args
+
+                if len(function_args) != 2:
+                    self._error(f"{setvar_function_name}() takes two arguments ({len(function_args)} given)", operator)
+
+                if not isinstance(function_args[0], ast.Str):
+                    self._error(f"{setvar_function_name}() first argument has to be string literal as variable name", operator)
+
+                value_node = self.parse_operator(function_args[1])
+
+                return self.create_node("sbs::function::set", operator, {"value": value_node}, constant=("string", function_args[0].s))
+
+            if function_name == sequence_function_name:
+                function_args = operator.args
+
+                if len(function_args) != 2:
+                    self._error(f"{sequence_function_name}() takes two arguments ({len(function_args)} given)", operator)
+
+                seqin_node = self.parse_operator(function_args[0])
+                seqlast_node = self.parse_operator(function_args[1])
+
+                return self.create_node("sbs::function::sequence", operator, {"seqin": seqin_node, "seqlast": seqlast_node})
+
+
+            self._error(f"Function {function_name}() not found", operator)
+
+    def compile_module(self, expr_tree: ast.Module) -> IRGraph:
+        self._reset()
+        self.set_variables = set_variable_names(expr_tree)
+
+        expressions = expr_tree.body
+
+        for expr in expressions:
+            expr_node = self.parse_operator(expr.value)
+
+            if isinstance(expr, ast.Assign):
+                assign_operator: ast.Assign = expr
+                variable_name = assign_operator.targets[0].id
+
+                self.var_scope[variable_name] = expr_node
+                self.var_declare_line[variable_name] = expr.lineno
+
+                if variable_name == output_variable_name:
+                    self.ir_graph.output = expr_node
+
+        if self.ir_graph.output is None:
+            self._error(f"No {output_variable_name} provided or output type mismatch", expressions[-1] if expressions else expr_tree)
+
+        if len(self.export_vars) > 0:
+            output_node = self.ir_graph.output
+            sequence_input = self.export_vars[0]
+
+            for i in range(1, len(self.export_vars)):
+                set_node = self.export_vars[i]
+                sequence_input = self.create_node("sbs::function::sequence", set_node, {"seqin": sequence_input, "seqlast": set_node})
+
+            self.ir_graph.output = self.create_node("sbs::function::sequence", output_node, {"seqin": sequence_input, "seqlast": output_node})
+
+        with self.profile("dead_nodes"):
+            self.ir_graph.eliminate_dead_nodes()
+
+        # a variable never read is reported even if its node is shared and stays in the graph
+        for variable_name, variable_line in self.var_declare_line.items():
+            if (variable_name not in self.used_vars and variable_name not in self.inputs_vars
+                    and variable_name != output_variable_name):
+                self.unused_vars.append((variable_name, variable_line))
+
+        self.unused_vars.sort(key=lambda var: var[1])
+
+        return self.ir_graph
+
+    def report_compile_stats(self, ir_graph: IRGraph):
+        if ir_graph.merged_nodes_num:
+            self.message(f"Merged {ir_graph.merged_nodes_num} duplicated nodes")
+
+        if ir_graph.interned_constants_num:
+            self.message(f"Shared {ir_graph.interned_constants_num} repeated constants")
+
+        if ir_graph.folded_nodes_num:
+            self.message(f"Folded {ir_graph.folded_nodes_num} constant expressions")
+
+        if ir_graph.simplified_nodes_num:
+            self.message(f"Simplified {ir_graph.simplified_nodes_num} arithmetic identities")
+
+        if ir_graph.removed_nodes_num:
+            self.message(f"Removed {ir_graph.removed_nodes_num} unused nodes")
+
+    def referenced_functions(self, src: str) -> list:
+        """Sorted names of imported functions [src] may call (every name in it that is an imported function)"""
+        return sorted(name for name in set(identifier_pattern.findall(src)) if name in self.imported_functions)
+
+    def compile_key(self, src: str) -> str:
+        """Hash of everything the compiled graph depends on: rendered [src], signatures of functions it calls,
+        inputs of graphs it declares and compiler version"""
+        key = hashlib.sha1()
+        key.update(compiler_version.encode())
+        key.update(src.encode())
+
+        for func_name in self.referenced_functions(src):
+            key.update(repr((func_name, self.imported_functions[func_name][2])).encode())
+
+        for graph_id in sorted({match[1] for match in declared_graph_pattern.findall(src)}):
+            key.update(repr((graph_id, self.get_graph_inputs(graph_id))).encode())
+
+        return key.hexdigest()
+
+    def check_budget(self, ir_graph: IRGraph, node_budget: int, connection_budget: int = 0, source_lines: list = None):
+        """Raise ParserError with the biggest lines of [ir_graph] if it has more nodes or connections than budgeted (0 is unlimited).
+
+        Lines are snippet lines if [source_lines] from render_source_lines() are given.
+        """
+        nodes_num = len(ir_graph)
+        connections_num = ir_graph.connections_num()
+
+        if (node_budget <= 0 or nodes_num <= node_budget) and (connection_budget <= 0 or connections_num <= connection_budget):
+            return
+
+        budget = [f"{node_budget} nodes" if node_budget > 0 else None,
+                  f"{connection_budget} connections" if connection_budget > 0 else None]
+        report = [f"ERROR: Graph has {nodes_num} nodes and {connections_num} connections "
+                  f"which exceeds the budget of {' and '.join(b for b in budget if b)}. "
+                  f"Biggest lines{'' if source_lines else ' (of rendered code)'}:"]
+
+        line_sizes = sorted(ir_graph.line_sizes(source_lines).items(), key=lambda line_size: line_size[1], reverse=True)
+        for lineno, (line_nodes, line_connections) in line_sizes[:budget_report_lines]:
+            report.append(f"    line {lineno}: {line_nodes} nodes, {line_connections} connections")
+
+        if len(line_sizes) > budget_report_lines:
+            report.append(f"    ... {len(line_sizes) - budget_report_lines} more lines")
+
+        raise ParserError("\n".join(report))
+
+    def report_unused_vars(self):
+        for variable_name, variable_line in self.unused_vars:
+            self.message(f"Warning: Unused variable [{variable_name}] (declared at line {variable_line})")
+
+
+def load_signatures(compiler: Compiler, signatures: dict):
+    """Register imported functions and graph inputs for headless compilation.
+
+    [signatures] is {"functions": {name: {"inputs": [[id, type], ...], "output": type, "url": resource url}},
+    "graphs": {graph id: [[id, type], ...]}} as stored in a JSON file. The optional url is used
+    as the function resource.
+    """
+    for func_name, func_signature in signatures.get("functions", {}).items():
+        input_names = [input_name for input_name, _ in func_signature.get("inputs", [])]
+        input_types = [input_type for _, input_type in func_signature.get("inputs", [])]
+        compiler.imported_functions[func_name] = (func_signature.get("url"), input_names,
+                                                  function_signature(input_names, input_types, func_signature.get("output")))
+
+    for graph_id, graph_inputs in signatures.get("graphs", {}).items():
+        compiler.graph_inputs[graph_id] = [tuple(graph_input) for graph_input in graph_inputs]
+
+
+def compile_source(src: str, package_dir: str = ".", signatures: dict = None, compiler: Compiler = None,
+                   jenv: jinja2.Environment = None) -> dict:
+    """Render, parse and compile snippet [src] without Substance Designer.
+
+    Returns {"graph": portable graph description, "stats": statistics, "messages": [...],
+    "source_lines": snippet line of every rendered line}.
+    The compiled IRGraph is left in [compiler].ir_graph (a new Compiler is used by default)
+    and [src] is rendered with [jenv] if given.
+    Raises ParserError, SyntaxError or jinja2.TemplateError for invalid snippets.
+    """
+    if compiler is None:
+        compiler = Compiler()
+    if signatures is not None:
+        load_signatures(compiler, signatures)
+
+    start_time = time.perf_counter()
+    with compiler.profile("render"):
+        stripped_src, source_lines = render_source_lines(src, package_dir, jenv)
+    render_time = time.perf_counter()
+    with compiler.profile("parse"):
+        expr_tree = ast.parse(stripped_src, mode="exec")
+    parse_time = time.perf_counter()
+    with compiler.profile("compile"):
+        ir_graph = compiler.compile_module(expr_tree)
+    compile_time = time.perf_counter()
+
+    compiler.report_compile_stats(ir_graph)
+    compiler.report_unused_vars()
+
+    stats = ir_graph.stats()
+    stats["compile_key"] = compiler.compile_key(stripped_src)
+    stats["render_time"] = render_time - start_time
+    stats["parse_time"] = parse_time - render_time
+    stats["compile_time"] = compile_time - parse_time
+
+    return {"graph": ir_graph.to_dict(source_lines), "stats": stats, "messages": compiler.messages,
+            "source_lines": source_lines}
+
+
+def compile_file(path: str, package_dir: str = None, signatures: dict = None, compiler: Compiler = None,
+                 jenv: jinja2.Environment = None) -> dict:
+    """compile_source() for .sex file [path] (includes are looked up next to it by default)"""
+    with open(path) as source_file:
+        src = source_file.read()
+
+    if package_dir is None:
+        package_dir = os.path.dirname(os.path.abspath(path))
+
+    return compile_source(src, package_dir, signatures, compiler, jenv)
@@ -0,0 +1,176 @@
+from sexfold import components, to_float32
+
+
+class NodeRecord:
+    """Plain description of a graph node used to compare compiled and existing graphs.
+
+    [kind] is the node definition id (or the resource url for function instances) and
+    [inputs] maps input property ids to the ids of connected nodes.
+    """
+
+    __slots__ = ("id", "kind", "constant", "inputs")
+
+    def __init__(self, node_id, kind: str, constant: tuple = None, inputs: dict = None):
+        self.id = node_id
+        self.kind = kind
+        self.constant = constant
+        self.inputs = inputs if inputs is not None else {}
+
+
+class GraphState:
+    """Records of all nodes of a function graph and the id of its output node"""
+
+    def __init__(self, records: list, output):
+        self.records = records
+        self.output = output
+
+
+class GraphDiff:
+    """Changes to apply to the existing graph.
+
+    [matched] maps new node ids to the ids of reused old nodes, [constants] are the new records
+    whose constant has to be set and [connections] are (record, input id) pairs to connect.
+    """
+
+    def __init__(self):
+        self.matched = {}
+        self.created = []
+        self.deleted = []
+        self.constants = []
+        self.connections = []
+        self.output_changed = False
+
+    def is_empty(self) -> bool:
+        return not (self.created or self.deleted or self.constants or self.connections or self.output_changed)
+
+
+def constant_value_key(constant: tuple) -> tuple:
+    """Constant identity as SD stores it (floats are compared as float32)"""
+    if constant is None:
+        return None
+
+    value_type, value = constant
+    values = []
+    for v in components(value):
+        if isinstance(v, float):
+            try:
+                v = to_float32(v).hex()
+            except OverflowError:
+                v = v.hex()
+        values.append(v)
+
+    return (value_type,) + tuple(values)
+
+
+def topological_order(records: list) -> list:
+    records_by_id = {r.id: r for r in records}
+    consumers = {r.id: [] for r in records}
+    pending_inputs = {}
+
+    for r in records:
+        sources = {src for src in r.inputs.values() if src in records_by_id}
+        pending_inputs[r.id] = len(sources)
+        for src in sources:
+            consumers[src].append(r)
+
+    queue = [r for r in records if pending_inputs[r.id] == 0]
+    ordered = []
+
+    while queue:
+        r = queue.pop()
+        ordered.append(r)
+        for consumer in consumers[r.id]:
+            pending_inputs[consumer.id] -= 1
+            if pending_inputs[consumer.id] == 0:
+                queue.append(consumer)
+
+    # nodes on cycles (can't be produced by the compiler) are kept at the end to be never matched
+    if len(ordered) != len(records):
+        ordered_ids = {r.id for r in ordered}
+        ordered += [r for r in records if r.id not in ordered_ids]
+
+    return ordered
+
+
+def structure_ids(records: list, interned: dict, with_constants: bool) -> dict:
+    """Number every node by its structure (kind, constant and structure of inputs).
+
+    [records] have to be in topological order. Nodes of different graphs get the same number
+    if they have identical structure as long as they share [interned] table.
+    """
+    ids = {}
+
+    for r in records:
+        inputs = tuple(sorted((name, ids.get(src, ("unknown", src))) for name, src in r.inputs.items()))
+        constant = constant_value_key(r.constant) if with_constants else None
+        ids[r.id] = interned.setdefault((r.kind, constant, inputs), len(interned))
+
+    return ids
+
+
+def kind_ids(records: list) -> dict:
+    """Key every node by its kind and names of connected inputs only"""
+    return {r.id: (r.kind, tuple(sorted(r.inputs))) for r in records}
+
+
+def match_nodes(new_records: list, new_ids: dict, old_records: list, old_ids: dict, matched: dict):
+    candidates = {}
+    matched_old = set(matched.values())
+    for r in old_records:
+        if r.id not in matched_old:
+            candidates.setdefault(old_ids[r.id], []).append(r.id)
+
+    for r in new_records:
+        if r.id not in matched:
+            same_nodes = candidates.get(new_ids[r.id])
+            if same_nodes:
+                matched[r.id] = same_nodes.pop()
+
+
+def diff_graph(new_records: list, new_output, old_state: GraphState) -> GraphDiff:
+    """Compute the changes turning [old_state] graph into the graph of [new_records].
+
+    [new_records] have to be in topological order. Nodes are matched with identical old nodes
+    first, then with old nodes of the same shape (identical structure up to constant values)
+    so changing a constant only updates this constant and finally with any old node of the same
+    kind and inputs so consumers of a changed subgraph are rewired instead of recreated.
+    """
+    diff = GraphDiff()
+    old_records = topological_order(old_state.records)
+
+    full_interned = {}
+    match_nodes(new_records, structure_ids(new_records, full_interned, True),
+                old_records, structure_ids(old_records, full_interned, True), diff.matched)
+
+    shape_interned = {}
+    match_nodes(new_records, structure_ids(new_records, shape_interned, False),
+                old_records, structure_ids(old_records, shape_interned, False), diff.matched)
+
+    match_nodes(new_records, kind_ids(new_records), old_records, kind_ids(old_records), diff.matched)
+
+    old_by_id = {r.id: r for r in old_records}
+
+    for r in new_records:
+        old_id = diff.matched.get(r.id)
+
+        if old_id is None:
+            diff.created.append(r)
+            if r.constant is not None:
+                diff.constants.append(r)
+            diff.connections += [(r, name) for name in r.inputs]
+            continue
+
+        old_record = old_by_id[old_id]
+        if constant_value_key(r.constant) != constant_value_key(old_record.constant):
+            diff.constants.append(r)
+
+        for name, src in r.inputs.items():
+            old_src = diff.matched.get(src)
+            if old_src is None or old_record.inputs.get(name) != old_src:
+                diff.connections.append((r, name))
+
+    matched_old = set(diff.matched.values())
+    diff.deleted = [r.id for r in old_records if r.id not in matched_old]
+    diff.output_changed = diff.matched.get(new_output) != old_state.output or old_state.output is None
+
+    return diff
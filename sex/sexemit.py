@@ -0,0 +1,210 @@
+import ast
+
+from contextlib import contextmanager
+from sexbackend import GraphBackend
+from sexcompiler import Compiler, output_variable_name
+from sexdiff import GraphDiff, GraphState, NodeRecord, diff_graph
+from sexir import IRGraph, IRNode
+from sexlayout import incremental_layout, layered_layout
+from sexprofile import ProfiledBackend
+
+compile_cache_size = 16
+
+
+class GraphEmitter(Compiler):
+    """Compiler that writes compiled graphs into a function graph through [backend]"""
+
+    def __init__(self, backend: GraphBackend = None):
+        super().__init__()
+        self.backend = backend
+        self.emitted_nodes = {}
+        self.matched_ids = {}
+        self.graph_states = {}
+        # positions of graph nodes known from earlier emits {state key: {node id: (x, y)}}
+        # so placing new nodes doesn't read positions of the whole graph
+        self.graph_positions = {}
+        self.compile_cache = {}
+        self.nodes_num = 0
+
+    @contextmanager
+    def profiled_backend(self, phase: str):
+        """Time [phase] counting graph operations made in it"""
+        backend = self.backend
+        if self.profiler is not None:
+            self.backend = ProfiledBackend(backend, self.profiler)
+
+        try:
+            with self.profile(phase):
+                yield
+        finally:
+            self.backend = backend
+
+    def create_graph_node(self, node: IRNode, position: tuple):
+        if node.function is not None:
+            graph_node = self.backend.new_instance_node(node.function, self.imported_functions[node.function][0])
+        else:
+            graph_node = self.backend.new_node(node.definition)
+
+        self.backend.set_position(graph_node, *position)
+        self.nodes_num += 1
+        return graph_node
+
+    def ir_records(self, ir_graph: IRGraph) -> list:
+        records = []
+
+        node: IRNode
+        for node in ir_graph.nodes:
+            if node.function is not None:
+                kind = self.backend.function_kind(node.function, self.imported_functions[node.function][0])
+            else:
+                kind = node.definition
+
+            records.append(NodeRecord(node.index, kind, node.constant,
+                                      {name: input_node.index for name, input_node in node.inputs.items()}))
+
+        return records
+
+    def layout_created(self, ir_graph: IRGraph, diff: GraphDiff, known_positions: dict) -> dict:
+        """{index: (x, y)} of nodes [diff] creates. A new graph is laid out as a whole, otherwise kept nodes
+        stay where they are (with any manual changes) and only the new ones are placed around them.
+
+        Only kept neighbours of new nodes are read, other kept nodes occupy their [known_positions] ({node id: (x, y)}).
+        """
+        if not diff.matched:
+            return dict(enumerate(layered_layout(ir_graph, self.backend.grid_size)))
+
+        # created nodes have no connections yet so all links to their consumers are in the diff
+        consumers = {record.id: [] for record in diff.created}
+        for record, input_name in diff.connections:
+            source_index = record.inputs[input_name]
+            if source_index in consumers:
+                consumers[source_index].append(record.id)
+
+        neighbours = {index for record in diff.created for index in record.inputs.values()}
+        neighbours.update(index for indices in consumers.values() for index in indices)
+        known_positions.update(self.backend.read_positions([diff.matched[index] for index in neighbours
+                                                            if index in diff.matched]))
+
+        kept_positions = {index: known_positions[node_id] for index, node_id in diff.matched.items()
+                          if node_id in known_positions}
+
+        return incremental_layout(ir_graph, consumers, kept_positions, self.backend.grid_size)
+
+    def read_graph_state(self, state_key, graph_key: str = None) -> GraphState:
+        """State of the graph [state_key] left by the last emit if the graph is still compiled from [graph_key]
+        and passes the cheap check of the backend, otherwise the whole graph is read"""
+        kept = self.graph_states.pop(state_key, None) if state_key is not None else None
+
+        if kept is not None and graph_key is not None and kept[0] == graph_key and self.backend.state_matches(kept[1]):
+            return kept[1]
+
+        with self.profile("read_state"):
+            return self.backend.read_state()
+
+    def emitted_node(self, index: int):
+        """Graph node of IR node [index] (matched nodes are looked up only when they're changed)"""
+        graph_node = self.emitted_nodes.get(index)
+        if graph_node is None:
+            graph_node = self.emitted_nodes[index] = self.backend.get_node(self.matched_ids[index])
+        return graph_node
+
+    def emit_graph(self, ir_graph: IRGraph, graph_key: str = None) -> GraphState:
+        """Update the existing graph to match [ir_graph] creating, deleting and rewiring only what differs.
+
+        Reused nodes are never moved, new nodes are positioned once right when they're created.
+        The graph is assumed to be in the state of the last emit if [graph_key] is the compile key it was
+        emitted with (see read_graph_state()). Returns the state of the updated graph.
+        """
+        self.nodes_num = 0
+        self.emitted_nodes = {}
+
+        state_key = self.backend.state_key()
+        records = self.ir_records(ir_graph)
+        diff = diff_graph(records, ir_graph.output.index, self.read_graph_state(state_key, graph_key))
+        self.matched_ids = diff.matched
+        known_positions = self.graph_positions.setdefault(state_key, {}) if state_key is not None else {}
+
+        for node_id in diff.deleted:
+            self.backend.delete_node(self.backend.get_node(node_id))
+            known_positions.pop(node_id, None)
+
+        positions = {}
+        if diff.created:
+            with self.profile("layout"):
+                positions = self.layout_created(ir_graph, diff, known_positions)
+
+        node_ids = dict(diff.matched)
+
+        record: NodeRecord
+        for record in diff.created:
+            graph_node = self.emitted_nodes[record.id] = self.create_graph_node(ir_graph.nodes[record.id],
+                                                                                positions[record.id])
+            node_ids[record.id] = self.backend.node_id(graph_node)
+            known_positions[node_ids[record.id]] = positions[record.id]
+
+        for record in diff.constants:
+            self.backend.set_constant(self.emitted_node(record.id), record.constant)
+
+        for record, input_name in diff.connections:
+            self.backend.connect(self.emitted_node(record.inputs[input_name]), self.emitted_node(record.id), input_name)
+
+        if diff.output_changed:
+            self.backend.set_output_node(self.emitted_node(ir_graph.output.index))
+
+        if diff.is_empty():
+            self.message("Graph is up to date")
+        else:
+            self.message(f"Created {len(diff.created)} nodes, deleted {len(diff.deleted)} nodes, "
+                         f"set {len(diff.constants)} constants, "
+                         f"rewired {len(diff.connections)} connections")
+
+        return GraphState([NodeRecord(node_ids[r.id], r.kind, r.constant,
+                                      {name: node_ids[index] for name, index in r.inputs.items()}) for r in records],
+                          node_ids[ir_graph.output.index])
+
+    def compile_graph(self, expr_tree: ast.Module, compile_key: str = None) -> tuple:
+        """Compile [expr_tree] without touching the graph. Returns (ir_graph, unused_vars) for emit_compiled().
+
+        Compiled graphs are cached by [compile_key] so [expr_tree] can be None if the key is cached.
+        """
+        cached = self.compile_cache.get(compile_key)
+
+        if cached is not None:
+            self.message("Compiled graph is restored from cache")
+            return cached
+
+        ir_graph = self.compile_module(expr_tree)
+        self.report_compile_stats(ir_graph)
+        compiled = (ir_graph, self.unused_vars)
+
+        if compile_key is not None:
+            if len(self.compile_cache) >= compile_cache_size:
+                self.compile_cache.pop(next(iter(self.compile_cache)), None)
+            self.compile_cache[compile_key] = compiled
+
+        return compiled
+
+    def emit_compiled(self, compiled: tuple, graph_key: str = None, compile_key: str = None):
+        """Update the graph with (ir_graph, unused_vars) returned by compile_graph().
+
+        [graph_key] is the compile key saved with the graph and [compile_key] the one of [compiled].
+        The state of the updated graph is kept by [compile_key] so the next emit doesn't read the whole graph.
+        """
+        ir_graph, self.unused_vars = compiled
+        self.ir_graph = ir_graph
+
+        with self.profiled_backend("emit"):
+            state = self.emit_graph(ir_graph, graph_key)
+
+            if self.backend.get_output_node() is None:
+                self._error(f"No {output_variable_name} provided or output type mismatch", ir_graph.output)
+
+            state_key = self.backend.state_key()
+            if compile_key is not None and state_key is not None:
+                self.graph_states[state_key] = (compile_key, state)
+
+        self.report_unused_vars()
+
+    def parse_module(self, expr_tree: ast.Module, compile_key: str = None):
+        """Compile [expr_tree] and update the graph"""
+        self.emit_compiled(self.compile_graph(expr_tree, compile_key))
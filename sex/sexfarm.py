@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import jinja2
+import sexcompiler
+
+source_extension = ".sex"
+
+
+class TrackingLoader(jinja2.FileSystemLoader):
+    """File system loader recording files of all loaded templates and paths of the missing ones"""
+
+    def __init__(self, searchpath):
+        super().__init__(searchpath)
+        self.loaded_files = []
+        self.missing_files = []
+
+    def get_source(self, environment, template):
+        try:
+            source, filename, uptodate = super().get_source(environment, template)
+        except jinja2.TemplateNotFound:
+            pieces = jinja2.loaders.split_template_path(template)
+            self.missing_files += [os.path.join(search_dir, *pieces) for search_dir in self.searchpath]
+            raise
+
+        self.loaded_files.append(filename)
+        return source, filename, uptodate
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as hashed_file:
+        return hashlib.sha1(hashed_file.read()).hexdigest()
+
+
+def dependency_hash(path: str) -> str:
+    """Hash of the file content or None if there's no such file"""
+    try:
+        return file_hash(path)
+    except OSError:
+        return None
+
+
+def dependencies_unchanged(dependencies: dict) -> bool:
+    """Check that files of {path: hash} [dependencies] still have the same content (None hash means the file
+    has to be still missing)"""
+    return all(dependency_hash(path) == path_hash for path, path_hash in dependencies.items())
+
+
+def find_sources(root_dir: str) -> list:
+    sources = []
+    for dir_path, _, file_names in os.walk(root_dir):
+        sources += [os.path.join(dir_path, name) for name in file_names if name.endswith(source_extension)]
+    return sorted(sources)
+
+
+def compile_job(source_path: str, package_dir: str, signatures: dict) -> dict:
+    """Compile one source with its own template environment and compiler (runs in worker processes)"""
+    if package_dir is None:
+        package_dir = os.path.dirname(os.path.abspath(source_path))
+
+    loader = TrackingLoader(package_dir)
+    job = {"source": source_path, "result": None, "error": None}
+
+    try:
+        job["result"] = sexcompiler.compile_file(source_path, package_dir, signatures,
+                                                 jenv=sexcompiler.new_jinja_environment(loader))
+    except (sexcompiler.ParserError, SyntaxError, jinja2.TemplateError) as err:
+        job["error"] = str(err)
+    except Exception as err:
+        # a crash on one source mustn't stop the whole run
+        job["error"] = f"{type(err).__name__}: {err}"
+
+    # missing includes are recorded too so creating them retries the source
+    job["dependencies"] = {path: dependency_hash(path)
+                           for path in [source_path] + loader.loaded_files + loader.missing_files}
+    return job
+
+
+class CompileCache:
+    """On-disk record of compiled sources valid while the source and all templates it includes are unchanged.
+
+    [context] identifies everything else the results depend on (compiler version, signatures, package dir).
+    """
+
+    def __init__(self, cache_dir: str, context: str):
+        self.cache_dir = cache_dir
+        self.context = context
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, source_path: str) -> str:
+        name = hashlib.sha1(os.path.abspath(source_path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, name + ".json")
+
+    def get(self, source_path: str) -> dict:
+        try:
+            with open(self.entry_path(source_path)) as entry_file:
+                job = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+        if job.get("context") != self.context or not dependencies_unchanged(job["dependencies"]):
+            return None
+
+        return job
+
+    def put(self, job: dict):
+        # results themselves are in the output files
+        entry = {"source": job["source"], "dependencies": job["dependencies"], "context": self.context}
+        with open(self.entry_path(job["source"]), "w") as entry_file:
+            json.dump(entry, entry_file)
+
+
+def compile_context(package_dir: str, signatures: dict) -> str:
+    context = json.dumps([sexcompiler.compiler_version, package_dir, signatures], sort_keys=True)
+    return hashlib.sha1(context.encode()).hexdigest()
+
+
+def output_path(source_path: str, root_dir: str, output_dir: str) -> str:
+    if output_dir is None:
+        return os.path.splitext(source_path)[0] + ".json"
+
+    relative_path = os.path.relpath(source_path, root_dir)
+    return os.path.join(output_dir, os.path.splitext(relative_path)[0] + ".json")
+
+
+def write_result(path: str, result: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as output_file:
+        json.dump(result, output_file, indent=4)
+
+
+def compile_directory(root_dir: str, executor: ProcessPoolExecutor, cache: CompileCache,
+                      output_dir: str = None, package_dir: str = None, signatures: dict = None,
+                      failures: dict = None) -> dict:
+    """Compile every .sex file under [root_dir] in [executor] skipping the cached ones.
+
+    Results are written as .json next to the sources or to the same tree under [output_dir].
+    Failed jobs are kept in [failures] ({source: job}) and aren't retried until their files change.
+    Returns the number of compiled, cached and failed sources.
+    """
+    if failures is None:
+        failures = {}
+
+    summary = {"compiled": 0, "cached": 0, "failed": 0}
+    pending = []
+
+    for source_path in find_sources(root_dir):
+        result_path = output_path(source_path, root_dir, output_dir)
+        failed_job = failures.get(source_path)
+
+        if failed_job is not None and dependencies_unchanged(failed_job["dependencies"]):
+            continue
+
+        if cache.get(source_path) is not None and os.path.isfile(result_path):
+            summary["cached"] += 1
+        else:
+            pending.append(source_path)
+
+    futures = [executor.submit(compile_job, source_path, package_dir, signatures) for source_path in pending]
+
+    for source_path, future in zip(pending, futures):
+        try:
+            job = future.result()
+        except Exception as err:
+            # the worker itself failed (e.g. it was killed)
+            job = {"source": source_path, "result": None, "error": f"{type(err).__name__}: {err}",
+                   "dependencies": {source_path: dependency_hash(source_path)}}
+
+        if job["error"] is not None:
+            print(f"{job['source']}: {job['error']}", file=sys.stderr)
+            failures[job["source"]] = job
+            summary["failed"] += 1
+            continue
+
+        failures.pop(job["source"], None)
+
+        write_result(output_path(job["source"], root_dir, output_dir), job["result"])
+        cache.put(job)
+        summary["compiled"] += 1
+
+    return summary
+
+
+def run_farm(root_dir: str, output_dir: str = None, package_dir: str = None, signatures: dict = None,
+             jobs: int = None, cache_dir: str = None, watch: bool = False, interval: float = 1.0) -> int:
+    """Compile all sources under [root_dir] with [jobs] processes (and keep recompiling changed ones if [watch])"""
+    if cache_dir is None:
+        cache_dir = os.path.join(output_dir if output_dir is not None else root_dir, ".sexcache")
+
+    cache = CompileCache(cache_dir, compile_context(package_dir, signatures))
+    failures = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        try:
+            while True:
+                start_time = time.perf_counter()
+                summary = compile_directory(root_dir, executor, cache, output_dir, package_dir, signatures, failures)
+
+                if not watch or summary["compiled"] or summary["failed"]:
+                    print(f"{summary['compiled']} compiled, {summary['cached']} cached, {summary['failed']} failed "
+                          f"in {time.perf_counter() - start_time:.2f}s", file=sys.stderr)
+
+                if not watch:
+                    return 1 if summary["failed"] else 0
+
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            return 0
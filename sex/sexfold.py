@@ -0,0 +1,192 @@
+import math
+import struct
+
+from sextypes import make_type, type_info
+
+int_min = -2 ** 31
+int_max = 2 ** 31 - 1
+
+
+def components(value) -> tuple:
+    return value if isinstance(value, tuple) else (value,)
+
+
+def to_float32(value: float) -> float:
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+def constant_components(constant: tuple) -> tuple:
+    """Components of (type, value) constant as SD stores them"""
+    value_type, value = constant
+    if type_info(value_type)[0] == "float":
+        return tuple(to_float32(v) for v in components(value))
+    return components(value)
+
+
+def make_constant(value_type: str, values: list) -> tuple:
+    """Build (type, value) from computed components using SD storage (float32 and int32)"""
+    base_type, _ = type_info(value_type)
+
+    if base_type == "float":
+        values = [to_float32(v) for v in values]
+        if not all(math.isfinite(v) for v in values):
+            return None
+
+    if base_type == "int" and not all(int_min <= v <= int_max for v in values):
+        return None
+
+    return value_type, values[0] if len(values) == 1 else tuple(values)
+
+
+def fold_componentwise(func, a: tuple, b: tuple, base_types: tuple = ("float", "int")) -> tuple:
+    type_a, type_b = a[0], b[0]
+    if type_a != type_b or type_info(type_a)[0] not in base_types:
+        return None
+
+    return make_constant(type_a, [func(x, y) for x, y in zip(constant_components(a), constant_components(b))])
+
+
+def fold_unary(func, a: tuple, base_types: tuple = ("float", "int")) -> tuple:
+    value_type = a[0]
+    if type_info(value_type)[0] not in base_types:
+        return None
+
+    return make_constant(value_type, [func(x) for x in constant_components(a)])
+
+
+def fold_mulscalar(a: tuple, scalar: tuple) -> tuple:
+    type_a = a[0]
+    if type_info(type_a)[0] != "float" or scalar[0] != "float":
+        return None
+
+    value_scalar = constant_components(scalar)[0]
+    return make_constant(type_a, [x * value_scalar for x in constant_components(a)])
+
+
+def fold_dot(a: tuple, b: tuple) -> tuple:
+    type_a, type_b = a[0], b[0]
+    if type_a != type_b or type_info(type_a)[0] != "float":
+        return None
+
+    result = 0.0
+    for x, y in zip(constant_components(a), constant_components(b)):
+        result = to_float32(result + to_float32(x * y))
+
+    return make_constant("float", [result])
+
+
+def fold_compare(func, a: tuple, b: tuple) -> tuple:
+    type_a, type_b = a[0], b[0]
+    if type_a != type_b or type_a not in ("float", "int"):
+        return None
+
+    return "bool", bool(func(constant_components(a)[0], constant_components(b)[0]))
+
+
+def fold_logical(func, a: tuple, b: tuple) -> tuple:
+    (type_a, value_a), (type_b, value_b) = a, b
+    if type_a != "bool" or type_b != "bool":
+        return None
+
+    return "bool", bool(func(value_a, value_b))
+
+
+def fold_vector(base_type: str, num_components: int, head: tuple, tail: tuple) -> tuple:
+    if type_info(head[0])[0] != base_type or type_info(tail[0])[0] != base_type:
+        return None
+
+    values = constant_components(head) + constant_components(tail)
+    if len(values) != num_components:
+        return None
+
+    return make_constant(make_type(base_type, num_components), list(values))
+
+
+def fold_swizzle(base_type: str, mask: tuple, vector: tuple) -> tuple:
+    if type_info(vector[0])[0] != base_type:
+        return None
+
+    vector_components = constant_components(vector)
+    mask_components = components(mask[1])
+    if any(c >= len(vector_components) for c in mask_components):
+        return None
+
+    return make_constant(make_type(base_type, len(mask_components)), [vector_components[c] for c in mask_components])
+
+
+def fold_cast(base_type: str, num_components: int, value: tuple) -> tuple:
+    if value[0] != make_type("int", num_components):
+        return None
+
+    return make_constant(make_type(base_type, num_components), [float(x) for x in constant_components(value)])
+
+
+def divide(x, y):
+    return x / y
+
+
+binary_folders = {
+    "sbs::function::add": lambda a, b: fold_componentwise(lambda x, y: x + y, a, b),
+    "sbs::function::sub": lambda a, b: fold_componentwise(lambda x, y: x - y, a, b),
+    "sbs::function::mul": lambda a, b: fold_componentwise(lambda x, y: x * y, a, b),
+    # integer division and modulo are left to SD
+    "sbs::function::div": lambda a, b: fold_componentwise(divide, a, b, ("float",)),
+    "sbs::function::min": lambda a, b: fold_componentwise(min, a, b),
+    "sbs::function::max": lambda a, b: fold_componentwise(max, a, b),
+    "sbs::function::dot": fold_dot,
+    "sbs::function::gt": lambda a, b: fold_compare(lambda x, y: x > y, a, b),
+    "sbs::function::gteq": lambda a, b: fold_compare(lambda x, y: x >= y, a, b),
+    "sbs::function::lr": lambda a, b: fold_compare(lambda x, y: x < y, a, b),
+    "sbs::function::lreq": lambda a, b: fold_compare(lambda x, y: x <= y, a, b),
+    "sbs::function::eq": lambda a, b: fold_compare(lambda x, y: x == y, a, b),
+    "sbs::function::noteq": lambda a, b: fold_compare(lambda x, y: x != y, a, b),
+    "sbs::function::and": lambda a, b: fold_logical(lambda x, y: x and y, a, b),
+    "sbs::function::or": lambda a, b: fold_logical(lambda x, y: x or y, a, b),
+}
+
+unary_folders = {
+    "sbs::function::neg": lambda a: fold_unary(lambda x: -x, a),
+    "sbs::function::abs": lambda a: fold_unary(abs, a),
+    "sbs::function::floor": lambda a: fold_unary(lambda x: float(math.floor(x)), a, ("float",)),
+    "sbs::function::ceil": lambda a: fold_unary(lambda x: float(math.ceil(x)), a, ("float",)),
+    "sbs::function::not": lambda a: ("bool", not a[1]) if a[0] == "bool" else None,
+}
+
+
+def fold_constants(definition: str, constant: tuple, inputs: dict) -> tuple:
+    """Evaluate node [definition] for constant [inputs] ({input id: (type, value)}).
+
+    Returns the resulting constant as (type, value) or None when the node can't be
+    folded with exactly the same result as SD would compute.
+    """
+    if definition is None:
+        return None
+
+    name = definition[len("sbs::function::"):]
+
+    try:
+        if definition in binary_folders and set(inputs) == {"a", "b"}:
+            return binary_folders[definition](inputs["a"], inputs["b"])
+
+        if definition in unary_folders and set(inputs) == {"a"}:
+            return unary_folders[definition](inputs["a"])
+
+        if definition == "sbs::function::mulscalar" and set(inputs) == {"a", "scalar"}:
+            return fold_mulscalar(inputs["a"], inputs["scalar"])
+
+        if name[:-1] in ("vector", "ivector") and set(inputs) == {"componentsin", "componentslast"}:
+            base_type = "float" if name.startswith("vector") else "int"
+            return fold_vector(base_type, int(name[-1]), inputs["componentsin"], inputs["componentslast"])
+
+        if name[:-1] in ("swizzle", "iswizzle") and constant is not None and set(inputs) == {"vector"}:
+            base_type = "float" if name.startswith("swizzle") else "int"
+            return fold_swizzle(base_type, constant, inputs["vector"])
+
+        if name.startswith("tofloat") and set(inputs) == {"value"}:
+            num_components = int(name[-1]) if name[-1].isdigit() else 1
+            return fold_cast("float", num_components, inputs["value"])
+
+    except ArithmeticError:
+        return None
+
+    return None
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+
+from collections.abc import Mapping
+
+# stored indices of other versions are discarded
+index_version = 2
+
+
+def function_alias(function_id: str, to_lower_case: bool = False) -> str:
+    """Name a function graph [function_id] is called by in snippets"""
+    alias = function_id.lower() if to_lower_case else function_id
+    alias = re.sub(r"[-(),.[\]]", "", alias)
+    if alias[:1].isdigit():
+        alias = "_" + alias
+    return alias
+
+
+def package_mtime(package_path: str) -> float:
+    try:
+        return os.path.getmtime(package_path)
+    except (OSError, ValueError):
+        return None
+
+
+class FunctionIndex:
+    """On-disk signatures of function graphs of packages reused across sessions.
+
+    An entry of a package is valid while its file keeps the same modification time and the package
+    has the same function graphs. Signatures are added as functions get resolved: {function id:
+    {"inputs": [[id, type], ...], "output": type}} ("inputs" and "output" as in load_signatures()).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.packages = {}
+        self.changed = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return
+
+        if isinstance(index, dict) and index.get("version") == index_version:
+            self.packages = index.get("packages", {})
+
+    def save(self):
+        if not self.changed:
+            return
+
+        # write a whole new file so a crash can't leave a broken index
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as index_file:
+            json.dump({"version": index_version, "packages": self.packages}, index_file)
+        os.replace(temp_path, self.path)
+        self.changed = False
+
+    def functions(self, package_path: str, function_ids) -> dict:
+        """Stored signatures of [package_path] functions. They're dropped if the package has changed since
+        ([function_ids] are its current function graphs)"""
+        mtime = package_mtime(package_path)
+        if mtime is None:
+            # unsaved package
+            return {}
+
+        function_ids = sorted(function_ids)
+        entry = self.packages.get(package_path)
+
+        if entry is None or entry["mtime"] != mtime or entry["ids"] != function_ids:
+            entry = self.packages[package_path] = {"mtime": mtime, "ids": function_ids, "functions": {}}
+            self.changed = True
+
+        return entry["functions"]
+
+    def store(self, package_path: str, function_id: str, signature: dict):
+        entry = self.packages.get(package_path)
+        if entry is not None:
+            entry["functions"][function_id] = signature
+            self.changed = True
+
+
+class UnresolvedFunction(Exception):
+    """Function [alias] needs SD to be resolved which isn't available in the current thread"""
+
+    def __init__(self, alias: str):
+        super().__init__(f"Function {alias}() isn't resolved")
+        self.alias = alias
+
+
+class FunctionTable(Mapping):
+    """Imported functions {alias: (resource, input ids, signature)} resolved on first lookup.
+
+    Only names are known until a function is looked up, then its [resolve]() callback is called once.
+    Functions added as [offline] are resolved without SD (e.g. from FunctionIndex) so any thread can resolve them.
+    """
+
+    def __init__(self):
+        self.resolvers = {}
+        self.resolved = {}
+
+    def add(self, alias: str, resolve, offline: bool = False):
+        self.resolvers[alias] = (resolve, offline)
+        self.resolved.pop(alias, None)
+
+    def update(self, table: "FunctionTable"):
+        for alias, (resolve, offline) in table.resolvers.items():
+            self.add(alias, resolve, offline)
+        self.resolved.update(table.resolved)
+
+    def __getitem__(self, alias: str) -> tuple:
+        function = self.resolved.get(alias)
+        if function is None:
+            resolve, _ = self.resolvers[alias]
+            function = self.resolved[alias] = resolve()
+        return function
+
+    def __contains__(self, alias) -> bool:
+        return alias in self.resolvers
+
+    def __iter__(self):
+        return iter(self.resolvers)
+
+    def __len__(self) -> int:
+        return len(self.resolvers)
+
+    def resolve(self, aliases):
+        """Resolve every known function of [aliases]"""
+        for alias in aliases:
+            if alias in self.resolvers:
+                self[alias]
+
+    def offline_copy(self) -> "FunctionTable":
+        """Copy for a thread without SD access: looking up a function that isn't resolved yet and needs SD
+        raises UnresolvedFunction"""
+        table = FunctionTable()
+        table.resolved = dict(self.resolved)
+
+        for alias, (resolve, offline) in self.resolvers.items():
+            if offline or alias in self.resolved:
+                table.resolvers[alias] = (resolve, offline)
+            else:
+                table.resolvers[alias] = (lambda alias=alias: unresolved_function(alias), False)
+
+        return table
+
+
+def unresolved_function(alias: str):
+    raise UnresolvedFunction(alias)
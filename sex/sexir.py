@@ -0,0 +1,198 @@
+class IRNode:
+    """Function graph node in the compiled representation.
+
+    Everything is plain Python: [definition] is the SD node definition id (None for
+    instances of imported functions, see [function]), [constant] is the value of the
+    __constant__ property as (type, value) and [inputs] maps input property ids
+    to the nodes connected to them. [side_effects] is set for nodes that set variables
+    (or may set them, like function instances) and for every node consuming them.
+    """
+
+    __slots__ = ("index", "definition", "function", "constant", "inputs", "type", "lineno", "col_offset", "side_effects")
+
+    def __init__(self, index: int, definition: str, inputs: dict = None, constant: tuple = None,
+                 function: str = None, node_type: str = None, lineno: int = 0, col_offset: int = 0,
+                 side_effects: bool = False):
+        self.index = index
+        self.definition = definition
+        self.function = function
+        self.constant = constant
+        self.inputs = inputs if inputs is not None else {}
+        self.type = node_type
+        self.lineno = lineno
+        self.col_offset = col_offset
+        self.side_effects = side_effects
+
+    def __repr__(self):
+        name = self.definition or self.function
+        return f"IRNode({self.index}, {name})"
+
+
+def constant_key(constant: tuple) -> tuple:
+    """Exact identity of (type, value) constant.
+
+    Python equality can't be used directly since 0.0 == -0.0 (and 1 == 1.0 == True).
+    """
+    if constant is None:
+        return None
+
+    value_type, value = constant
+    values = value if isinstance(value, tuple) else (value,)
+    return (value_type,) + tuple(v.hex() if isinstance(v, float) else v for v in values)
+
+
+def node_key(definition: str, function: str, constant: tuple, inputs: dict) -> tuple:
+    input_keys = tuple(sorted((name, node.index) for name, node in inputs.items())) if inputs else ()
+    return (definition, function, constant_key(constant), input_keys)
+
+
+class IRGraph:
+    """Typed DAG built by the parser before any SD node is created.
+
+    Nodes are stored in creation order. Inputs are always created before
+    the nodes consuming them so [nodes] is a valid topological order.
+
+    Nodes are hash-consed: adding a node structurally identical to an existing one
+    (same definition, constant and inputs) returns the existing node instead.
+    Constant nodes are interned by (type, value) so every distinct literal is a single node.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.output = None
+        self.merged_nodes_num = 0
+        self.folded_nodes_num = 0
+        self.interned_constants_num = 0
+        self.simplified_nodes_num = 0
+        self.removed_nodes_num = 0
+        self._node_keys = {}
+        self._constants = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add_node(self, definition: str, inputs: dict = None, constant: tuple = None,
+                 function: str = None, node_type: str = None, lineno: int = 0, col_offset: int = 0,
+                 mergeable: bool = True, side_effects: bool = False) -> IRNode:
+        if mergeable:
+            key = node_key(definition, function, constant, inputs)
+            node = self._node_keys.get(key)
+            if node is not None:
+                self.merged_nodes_num += 1
+                return node
+
+        # consumers inherit side effects of their inputs
+        if inputs and not side_effects:
+            side_effects = any(n.side_effects for n in inputs.values())
+        node = IRNode(len(self.nodes), definition, inputs, constant, function, node_type, lineno, col_offset, side_effects)
+        self.nodes.append(node)
+
+        if mergeable:
+            self._node_keys[key] = node
+
+        return node
+
+    def add_constant(self, definition: str, constant: tuple, lineno: int = 0, col_offset: int = 0) -> IRNode:
+        key = constant_key(constant)
+        node = self._constants.get(key)
+        if node is not None:
+            self.interned_constants_num += 1
+            return node
+
+        node = IRNode(len(self.nodes), definition, constant=constant, node_type=constant[0], lineno=lineno, col_offset=col_offset)
+        self.nodes.append(node)
+        self._constants[key] = node
+
+        return node
+
+    def eliminate_dead_nodes(self) -> list:
+        """Remove all nodes the output doesn't depend on and return them.
+
+        Relies on [nodes] being in topological order so a single reverse sweep is enough.
+        """
+        live = [False] * len(self.nodes)
+        if self.output is not None:
+            live[self.output.index] = True
+
+        for node in reversed(self.nodes):
+            if live[node.index]:
+                for input_node in node.inputs.values():
+                    live[input_node.index] = True
+
+        dead_nodes = [node for node in self.nodes if not live[node.index]]
+        if not dead_nodes:
+            return dead_nodes
+
+        self.removed_nodes_num += len(dead_nodes)
+
+        mergeable_nodes = set(self._node_keys.values())
+        self._constants = {key: n for key, n in self._constants.items() if live[n.index]}
+
+        self.nodes = [node for node in self.nodes if live[node.index]]
+        for index, node in enumerate(self.nodes):
+            node.index = index
+
+        # keys hold input indices so they have to be rebuilt
+        self._node_keys = {node_key(n.definition, n.function, n.constant, n.inputs): n
+                           for n in self.nodes if n in mergeable_nodes}
+
+        return dead_nodes
+
+    def connections_num(self) -> int:
+        return sum(len(node.inputs) for node in self.nodes)
+
+    def line_sizes(self, source_lines: list = None) -> dict:
+        """Number of nodes and connections created by each source line as {lineno: [nodes, connections]}.
+
+        Rendered lines are counted as the snippet lines they come from if [source_lines] from render_source_lines() are given.
+        """
+        sizes = {}
+        for node in self.nodes:
+            lineno = node.lineno
+            if source_lines and 0 < lineno <= len(source_lines):
+                lineno = source_lines[lineno - 1]
+            line_size = sizes.setdefault(lineno, [0, 0])
+            line_size[0] += 1
+            line_size[1] += len(node.inputs)
+        return sizes
+
+    def stats(self) -> dict:
+        return {
+            "nodes": len(self.nodes),
+            "connections": self.connections_num(),
+            "merged_nodes": self.merged_nodes_num,
+            "interned_constants": self.interned_constants_num,
+            "folded_nodes": self.folded_nodes_num,
+            "simplified_nodes": self.simplified_nodes_num,
+            "removed_nodes": self.removed_nodes_num,
+        }
+
+    def to_dict(self, source_lines: list = None) -> dict:
+        """Portable description of the graph (JSON serializable).
+
+        Nodes are tagged with their snippet lines if [source_lines] from render_source_lines() are given.
+        """
+        nodes = []
+
+        for node in self.nodes:
+            description = {"id": node.index}
+
+            if node.function is not None:
+                description["function"] = node.function
+            else:
+                description["definition"] = node.definition
+
+            if node.constant is not None:
+                value_type, value = node.constant
+                description["constant"] = [value_type, list(value) if isinstance(value, tuple) else value]
+
+            if node.inputs:
+                description["inputs"] = {name: input_node.index for name, input_node in node.inputs.items()}
+
+            description["type"] = node.type
+            description["line"] = node.lineno
+            if source_lines and 0 < node.lineno <= len(source_lines):
+                description["snippet_line"] = source_lines[node.lineno - 1]
+            nodes.append(description)
+
+        return {"nodes": nodes, "output": self.output.index if self.output is not None else None}
@@ -0,0 +1,246 @@
+from sexir import IRGraph
+
+# horizontal distance between columns in grid cells
+column_spacing = 1.3
+
+# number of alternating median sweeps reordering the columns to reduce crossings
+crossing_sweeps = 4
+
+# longer connections get no dummy nodes (they'd add a node per column for every input shared across the graph)
+max_dummy_span = 8
+
+# rows searched above and below the desired place of a new node before trying the next column
+max_row_search = 16
+
+
+def node_layers(ir_graph: IRGraph) -> list:
+    """Column of every node: the longest path from it to a node nothing is connected to (the output is column 0).
+
+    Inputs always precede their consumers in [ir_graph].nodes so one pass in reverse order is enough.
+    """
+    layers = [0] * len(ir_graph.nodes)
+
+    for node in reversed(ir_graph.nodes):
+        input_layer = layers[node.index] + 1
+        for input_node in node.inputs.values():
+            if layers[input_node.index] < input_layer:
+                layers[input_node.index] = input_layer
+
+    return layers
+
+
+class LayeredGraph:
+    """Graph nodes split into columns where every link connects neighbouring columns.
+
+    Vertices are node indices followed by dummy vertices breaking connections over several columns.
+    [consumers] and [inputs] hold linked vertices of the previous and the next column.
+    """
+
+    def __init__(self, ir_graph: IRGraph):
+        self.nodes_num = len(ir_graph.nodes)
+        self.layers = node_layers(ir_graph)
+        self.consumers = [[] for _ in range(self.nodes_num)]
+        self.inputs = [[] for _ in range(self.nodes_num)]
+
+        for node in ir_graph.nodes:
+            for input_node in node.inputs.values():
+                self.add_link(node.index, input_node.index)
+
+        self.columns = [[] for _ in range(max(self.layers) + 1)] if self.layers else []
+        for vertex, layer in enumerate(self.layers):
+            self.columns[layer].append(vertex)
+
+    def new_vertex(self, layer: int) -> int:
+        self.layers.append(layer)
+        self.consumers.append([])
+        self.inputs.append([])
+        return len(self.layers) - 1
+
+    def add_link(self, consumer: int, source: int):
+        span = self.layers[source] - self.layers[consumer]
+        if span > max_dummy_span:
+            return
+
+        for layer in range(self.layers[consumer] + 1, self.layers[source]):
+            dummy = self.new_vertex(layer)
+            self.inputs[consumer].append(dummy)
+            self.consumers[dummy].append(consumer)
+            consumer = dummy
+
+        self.inputs[consumer].append(source)
+        self.consumers[source].append(consumer)
+
+
+def column_crossings(column: list, next_column: list, links: list, rows: list) -> int:
+    """Number of crossing links between neighbouring columns (counted as inversions with a Fenwick tree)"""
+    targets = sorted((rows[source], rows[target]) for source in column for target in links[source])
+    tree = [0] * (len(next_column) + 1)
+    crossings = 0
+
+    for links_num, (_, target_row) in enumerate(targets):
+        # links already added which end below this one
+        index = target_row + 1
+        not_below = 0
+        while index > 0:
+            not_below += tree[index]
+            index -= index & -index
+        crossings += links_num - not_below
+
+        index = target_row + 1
+        while index <= len(next_column):
+            tree[index] += 1
+            index += index & -index
+
+    return crossings
+
+
+def order_column(column: list, neighbours: list, rows: list):
+    """Sort [column] by median row of [neighbours] of every vertex (vertices without them stay where they are)"""
+    keys = {}
+    for vertex in column:
+        neighbour_rows = sorted(rows[neighbour] for neighbour in neighbours[vertex])
+        if neighbour_rows:
+            middle = len(neighbour_rows) // 2
+            if len(neighbour_rows) % 2:
+                keys[vertex] = neighbour_rows[middle]
+            else:
+                keys[vertex] = (neighbour_rows[middle - 1] + neighbour_rows[middle]) / 2.0
+        else:
+            keys[vertex] = rows[vertex]
+
+    column.sort(key=lambda vertex: (keys[vertex], rows[vertex]))
+    for row, vertex in enumerate(column):
+        rows[vertex] = row
+
+
+def minimize_crossings(graph: LayeredGraph) -> list:
+    """Columns of [graph] reordered by alternating median sweeps, the order with fewest crossings is kept"""
+    columns = graph.columns
+    rows = [0] * len(graph.layers)
+
+    # start from the order of first consumers
+    for column in columns:
+        if column is not columns[0]:
+            column.sort(key=lambda vertex: min((rows[c] for c in graph.consumers[vertex]), default=rows[vertex]))
+        for row, vertex in enumerate(column):
+            rows[vertex] = row
+
+    def crossings() -> int:
+        return sum(column_crossings(columns[i], columns[i + 1], graph.inputs, rows) for i in range(len(columns) - 1))
+
+    best_crossings = crossings()
+    best_columns = [list(column) for column in columns]
+
+    for sweep in range(crossing_sweeps):
+        if best_crossings == 0:
+            break
+
+        if sweep % 2 == 0:
+            for column in columns[1:]:
+                order_column(column, graph.consumers, rows)
+        else:
+            for column in reversed(columns[:-1]):
+                order_column(column, graph.inputs, rows)
+
+        sweep_crossings = crossings()
+        if sweep_crossings < best_crossings:
+            best_crossings = sweep_crossings
+            best_columns = [list(column) for column in columns]
+
+    return best_columns
+
+
+def column_offsets(desired: list, spacing: float) -> list:
+    """Positions closest on average to [desired] ones keeping their order and at least [spacing] apart"""
+    positions = []
+    for position in desired:
+        if positions and position < positions[-1] + spacing:
+            position = positions[-1] + spacing
+        positions.append(position)
+
+    shift = (sum(desired) - sum(positions)) / len(positions) if positions else 0.0
+    return [position + shift for position in positions]
+
+
+def layered_layout(ir_graph: IRGraph, grid_size: float) -> list:
+    """(x, y) of every node of [ir_graph] in columns flowing from inputs on the left to the output on the right.
+
+    Rows are ordered to reduce crossing connections and every node is pulled towards its consumers.
+    """
+    graph = LayeredGraph(ir_graph)
+    columns = minimize_crossings(graph)
+    positions = [None] * graph.nodes_num
+
+    if not columns:
+        return positions
+
+    column_width = grid_size * column_spacing
+    graph_width = len(columns) * column_width
+    y_positions = [0.0] * len(graph.layers)
+
+    for column_index, column in enumerate(columns):
+        if column_index == 0:
+            desired = [row * grid_size for row in range(len(column))]
+        else:
+            desired = []
+            for vertex in column:
+                consumer_positions = [y_positions[consumer] for consumer in graph.consumers[vertex]]
+                if not consumer_positions:
+                    consumer_positions = [desired[-1] + grid_size if desired else 0.0]
+                desired.append(sum(consumer_positions) / len(consumer_positions))
+
+        x = graph_width - (column_index + 1) * column_width
+        for vertex, y in zip(column, column_offsets(desired, grid_size)):
+            y_positions[vertex] = y
+            if vertex < graph.nodes_num:
+                positions[vertex] = (x, y)
+
+    return positions
+
+
+def free_cell(occupied: set, column: int, row: int, direction: int) -> tuple:
+    """Free cell closest to ([column], [row]) searching its column first and then next ones in [direction]"""
+    while True:
+        for offset in range(max_row_search + 1):
+            for cell in ((column, row + offset), (column, row - offset)):
+                if cell not in occupied:
+                    return cell
+        column += direction
+
+
+def incremental_layout(ir_graph: IRGraph, consumers: dict, kept_positions: dict, grid_size: float) -> dict:
+    """(x, y) of new nodes of [ir_graph] placed around kept nodes which stay at their [kept_positions] ({index: (x, y)}).
+
+    [consumers] maps every new node index to indices of nodes it's connected to. A new node goes a column left
+    of its consumers (or right of its inputs if it has none) to the free cell closest to their average row,
+    so the placement work depends on the number of new nodes and not on the size of the graph.
+    """
+    column_width = grid_size * column_spacing
+
+    def cell(position: tuple) -> tuple:
+        return round(position[0] / column_width), round(position[1] / grid_size)
+
+    occupied = {cell(position) for position in kept_positions.values()}
+    cells = {}
+
+    # consumers follow their inputs in [ir_graph].nodes so they are placed first
+    for index in sorted(consumers, reverse=True):
+        consumer_cells = [cells[consumer] if consumer in cells else cell(kept_positions[consumer])
+                          for consumer in consumers[index] if consumer in cells or consumer in kept_positions]
+
+        if consumer_cells:
+            neighbour_cells = consumer_cells
+            column, direction = min(column for column, _ in consumer_cells) - 1, -1
+        else:
+            neighbour_cells = [cell(kept_positions[input_node.index]) for input_node in ir_graph.nodes[index].inputs.values()
+                               if input_node.index in kept_positions]
+            if not neighbour_cells:
+                # nothing around is placed yet: start a column right of the whole graph
+                neighbour_cells = [(max((column for column, _ in occupied), default=-1), 0)]
+            column, direction = max(column for column, _ in neighbour_cells) + 1, 1
+
+        row = round(sum(row for _, row in neighbour_cells) / len(neighbour_cells))
+        cells[index] = free_cell(occupied, column, row, direction)
+        occupied.add(cells[index])
+
+    return {index: (column * column_width, row * grid_size) for index, (column, row) in cells.items()}
@@ -0,0 +1,165 @@
+import json
+import time
+
+from functools import partial
+
+
+class ProfilePhase:
+    __slots__ = ("name", "time", "count", "calls")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.time = 0.0
+        self.count = 0
+        self.calls = {}
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "time": self.time, "count": self.count, "calls": self.calls}
+
+
+class PhaseTimer:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.begin(self.name)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.end()
+
+
+class Profiler:
+    """Accumulates wall time, number of runs and graph API calls of named compile phases.
+
+    Phases can be nested: a nested phase is reported as "parent.child" and its time is included in the parent.
+    A phase entered several times (e.g. type checking of every node) is accumulated into a single record.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._stack = []
+        self._start_times = []
+
+    def phase(self, name: str) -> PhaseTimer:
+        return PhaseTimer(self, name)
+
+    def begin(self, name: str):
+        if self._stack:
+            name = f"{self._stack[-1].name}.{name}"
+
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = ProfilePhase(name)
+
+        self._stack.append(phase)
+        self._start_times.append(time.perf_counter())
+
+    def end(self):
+        phase = self._stack.pop()
+        phase.time += time.perf_counter() - self._start_times.pop()
+        phase.count += 1
+
+    def count_call(self, operation: str, count: int = 1):
+        """Count graph API call [operation] in the current phase"""
+        if self._stack:
+            phase = self._stack[-1]
+        else:
+            phase = self.phases.setdefault("other", ProfilePhase("other"))
+        phase.calls[operation] = phase.calls.get(operation, 0) + count
+
+    def total_time(self) -> float:
+        return sum(phase.time for phase in self.phases.values() if "." not in phase.name)
+
+    def summary(self) -> list:
+        """Lines of human readable report"""
+        lines = [f"Compile profile: {self.total_time() * 1000.0:.1f} ms"]
+
+        for phase in self.phases.values():
+            depth = phase.name.count(".")
+            line = f"{'  ' * (depth + 1)}{phase.name.rpartition('.')[2]:<{24 - 2 * depth}}{phase.time * 1000.0:10.1f} ms"
+
+            if phase.count > 1:
+                line += f"  x{phase.count}"
+            if phase.calls:
+                line += "  " + ", ".join(f"{operation}: {count}" for operation, count in phase.calls.items())
+
+            lines.append(line)
+
+        return lines
+
+    def to_dict(self) -> dict:
+        return {"total_time": self.total_time(), "phases": [phase.to_dict() for phase in self.phases.values()]}
+
+    def write(self, path: str):
+        with open(path, "w") as trace_file:
+            json.dump(self.to_dict(), trace_file, indent=4)
+
+
+class ProfiledBackend:
+    """Graph backend wrapper counting graph API calls every operation on [backend] makes
+    (as reported by its api_calls) in the current phase of [profiler]"""
+
+    def __init__(self, backend, profiler: Profiler):
+        self.backend = backend
+        self.profiler = profiler
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.backend, name)
+        if not callable(attribute):
+            return attribute
+
+        def profiled_call(*args, **kwargs):
+            api_calls = self.backend.api_calls
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                if self.backend.api_calls > api_calls:
+                    self.profiler.count_call(name, self.backend.api_calls - api_calls)
+
+        return profiled_call
+
+
+# values returned by API calls that aren't API objects
+plain_types = (str, int, float, bool, tuple, list, dict)
+
+
+def counted(value, counter):
+    """[value] returned by an API call wrapped to count calls of its methods in [counter].api_calls"""
+    if value is None or isinstance(value, (plain_types, CountedObject)):
+        return value
+    return CountedObject(value, counter)
+
+
+def call_counted(counter, function, *args):
+    """Call API [function] counting the call in [counter].api_calls (objects it returns are counted as well)"""
+    counter.api_calls += 1
+    return counted(function(*[arg.api_object if isinstance(arg, CountedObject) else arg for arg in args]), counter)
+
+
+class CountedObject:
+    """Proxy of API object (e.g. SD node) [api_object]: every method call and array item access goes through call_counted()"""
+
+    __slots__ = ("api_object", "counter")
+
+    def __init__(self, api_object, counter):
+        self.api_object = api_object
+        self.counter = counter
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.api_object, name)
+        if callable(attribute):
+            return partial(call_counted, self.counter, attribute)
+        return attribute
+
+    def __len__(self) -> int:
+        return self.getSize()
+
+    def __getitem__(self, index: int):
+        return self.getItem(index)
+
+    def __iter__(self):
+        for index in range(self.getSize()):
+            yield self.getItem(index)
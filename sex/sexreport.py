@@ -0,0 +1,95 @@
+from sexcompiler import constant_node_definitions, get_variable_map, samplers_map
+from sexir import IRGraph, IRNode
+
+# rough relative cost of evaluating a node (per component of its result), everything else costs 1
+definition_costs = {definition: 0.0 for definition in constant_node_definitions.values()}
+definition_costs.update({definition: 0.5 for definition in get_variable_map.values()})
+definition_costs.update({definition: 20.0 for definition in samplers_map.values()})
+definition_costs.update({
+    "sbs::function::sin": 4.0,
+    "sbs::function::cos": 4.0,
+    "sbs::function::tan": 4.0,
+    "sbs::function::atan2": 6.0,
+    "sbs::function::cartesian": 8.0,
+    "sbs::function::sqrt": 3.0,
+    "sbs::function::log": 4.0,
+    "sbs::function::log2": 4.0,
+    "sbs::function::exp": 4.0,
+    "sbs::function::pow2": 4.0,
+    "sbs::function::div": 2.0,
+    "sbs::function::mod": 2.0,
+    "sbs::function::rand": 4.0,
+})
+
+# body of an imported function is unknown
+function_cost = 10.0
+
+type_components = {"float2": 2, "float3": 3, "float4": 4, "int2": 2, "int3": 3, "int4": 4}
+
+
+def node_cost(node: IRNode) -> float:
+    base_cost = function_cost if node.function is not None else definition_costs.get(node.definition, 1.0)
+    return base_cost * type_components.get(node.type, 1)
+
+
+def line_stats(ir_graph: IRGraph, source_lines: list = None) -> list:
+    """Nodes of [ir_graph] grouped by the snippet line they come from ([source_lines] from render_source_lines())
+    or by rendered line if it's unknown.
+
+    Returns [(snippet line or None, rendered lines, nodes, cost)] from the most expensive group.
+    """
+    groups = {}
+
+    for node in ir_graph.nodes:
+        if source_lines and 0 < node.lineno <= len(source_lines):
+            key = (source_lines[node.lineno - 1], None)
+        else:
+            key = (None, node.lineno)
+
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [set(), 0, 0.0]
+
+        group[0].add(node.lineno)
+        group[1] += 1
+        group[2] += node_cost(node)
+
+    stats = [(snippet_line, rendered_lines, nodes, cost)
+             for (snippet_line, _), (rendered_lines, nodes, cost) in groups.items()]
+    stats.sort(key=lambda line_stat: (line_stat[2], line_stat[3]), reverse=True)
+    return stats
+
+
+def line_report(ir_graph: IRGraph, src: str, source_lines: list = None, rows: int = 10, rendered_src: str = None) -> list:
+    """Lines of a table with [rows] snippet lines producing most of [ir_graph] nodes and their estimated cost.
+
+    Code of lines missing in [source_lines] is taken from [rendered_src] if it's given.
+    """
+    src_lines = src.splitlines()
+    rendered_lines = rendered_src.splitlines() if rendered_src is not None else []
+    stats = line_stats(ir_graph, source_lines)
+
+    report = [f"Nodes by line ({len(ir_graph)} nodes, estimated cost {sum(map(node_cost, ir_graph.nodes)):.0f}):",
+              "      line   nodes      cost  code"]
+
+    for snippet_line, lines, nodes, cost in stats[:rows]:
+        if snippet_line is not None:
+            line_label = str(snippet_line)
+            code = src_lines[snippet_line - 1] if 0 < snippet_line <= len(src_lines) else ""
+        else:
+            rendered_line = min(lines)
+            line_label = f"r{rendered_line}"
+            code = rendered_lines[rendered_line - 1] if 0 < rendered_line <= len(rendered_lines) else ""
+
+        code = code.strip()
+        if len(code) > 60:
+            code = code[:57] + "..."
+        if len(lines) > 1:
+            code += f"  ({len(lines)} rendered lines)"
+
+        report.append(f"    {line_label:>6}  {nodes:6}  {cost:8.0f}  {code}")
+
+    if len(stats) > rows:
+        report.append(f"    ... {len(stats) - rows} more lines")
+
+    return report
@@ -0,0 +1,219 @@
+import uuid
+import xml.etree.ElementTree as ET
+
+from sexcompiler import variable_get_definitions
+from sexir import IRGraph, IRNode
+from sexlayout import layered_layout
+
+format_version = "1.1.0.201807"
+
+# SD graph grid first level size is 32
+grid_size = 1.4 * 32.0
+
+function_prefix = "sbs::function::"
+
+sbs_types = {
+    "bool": 4,
+    "int": 16,
+    "int2": 32,
+    "int3": 64,
+    "int4": 128,
+    "float": 256,
+    "float2": 512,
+    "float3": 1024,
+    "float4": 2048,
+    "string": 16384,
+}
+
+constant_value_tags = {
+    "bool": "constantValueBool",
+    "int": "constantValueInt32",
+    "int2": "constantValueInt2",
+    "int3": "constantValueInt3",
+    "int4": "constantValueInt4",
+    "float": "constantValueFloat1",
+    "float2": "constantValueFloat2",
+    "float3": "constantValueFloat3",
+    "float4": "constantValueFloat4",
+    "string": "constantValueString",
+}
+
+
+# zero value of every input type written as the default of function inputs
+default_values = {
+    "bool": False,
+    "int": 0,
+    "int2": (0, 0),
+    "int3": (0, 0, 0),
+    "int4": (0, 0, 0, 0),
+    "float": 0.0,
+    "float2": (0.0, 0.0),
+    "float3": (0.0, 0.0, 0.0),
+    "float4": (0.0, 0.0, 0.0, 0.0),
+    "string": "",
+}
+
+
+def sbs_value(value) -> str:
+    if isinstance(value, tuple):
+        return " ".join(sbs_value(v) for v in value)
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def value_element(parent: ET.Element, tag: str, value) -> ET.Element:
+    return ET.SubElement(parent, tag, v=sbs_value(value))
+
+
+def func_data_element(parent: ET.Element, name: str, constant: tuple) -> ET.Element:
+    value_type, value = constant
+    func_data = ET.SubElement(parent, "funcData")
+    value_element(func_data, "name", name)
+    constant_value = ET.SubElement(func_data, "constantValue")
+    value_element(constant_value, constant_value_tags[value_type], value)
+    return func_data
+
+
+def function_inputs(ir_graph: IRGraph, declared_inputs: list = None, set_variables: set = None) -> list:
+    """Inputs [(id, type)] a function graph of [ir_graph] needs: [declared_inputs] followed by all other
+    variables it reads which aren't system variables ($pos etc.) or [set_variables] set by the graph itself.
+    """
+    inputs = dict(declared_inputs) if declared_inputs else {}
+    set_variables = set_variables if set_variables is not None else set()
+
+    for node in ir_graph.nodes:
+        if node.definition not in variable_get_definitions or node.constant is None:
+            continue
+
+        variable_name = node.constant[1]
+        if variable_name.startswith("$") or variable_name in set_variables:
+            continue
+
+        input_type = inputs.setdefault(variable_name, node.type)
+        if input_type != node.type:
+            raise ValueError(f"Input {variable_name} is read as {node.type} but it's {input_type}")
+
+    return list(inputs.items())
+
+
+class SbsWriter:
+    """Writes compiled graphs as function graphs of .sbs package XML.
+
+    Instances of imported functions need their resource url ("pkg:///name?dependency=uid")
+    in [function_urls] and the package files they come from in [dependencies] ({uid: "sbs://functions.sbs"}).
+    """
+
+    def __init__(self, function_urls: dict = None, dependencies: dict = None):
+        self.function_urls = function_urls if function_urls is not None else {}
+        self.dependencies = dependencies if dependencies is not None else {}
+        self.functions = []
+        self._next_uid = 1000000000
+
+    def new_uid(self) -> int:
+        self._next_uid += 1
+        return self._next_uid
+
+    def node_element(self, parent: ET.Element, node: IRNode, position: tuple, uids: dict) -> ET.Element:
+        param_node = ET.SubElement(parent, "paramNode")
+        value_element(param_node, "uid", uids[node.index])
+
+        func_datas = None
+
+        if node.function is not None:
+            url = self.function_urls.get(node.function)
+            if url is None:
+                raise ValueError(f"No resource url for imported function {node.function}()")
+            value_element(param_node, "function", "instance")
+            func_datas = ET.SubElement(param_node, "funcDatas")
+            func_data_element(func_datas, "instance", ("string", url))
+        else:
+            value_element(param_node, "function", node.definition[len(function_prefix):])
+
+        if node.type in sbs_types:
+            value_element(param_node, "type", sbs_types[node.type])
+
+        if node.constant is not None:
+            if func_datas is None:
+                func_datas = ET.SubElement(param_node, "funcDatas")
+            func_data_element(func_datas, "__constant__", node.constant)
+
+        if node.inputs:
+            connections = ET.SubElement(param_node, "connections")
+            for input_name, input_node in node.inputs.items():
+                connection = ET.SubElement(connections, "connection")
+                value_element(connection, "identifier", input_name)
+                value_element(connection, "connRef", uids[input_node.index])
+
+        gui_layout = ET.SubElement(param_node, "GUILayout")
+        value_element(gui_layout, "gpos", f"{position[0]} {position[1]} 0")
+
+        return param_node
+
+    def input_element(self, parent: ET.Element, input_id: str, input_type: str) -> ET.Element:
+        if input_type not in sbs_types:
+            raise ValueError(f"Input {input_id} has unsupported type {input_type}")
+
+        param_input = ET.SubElement(parent, "paramInput")
+        value_element(param_input, "identifier", input_id)
+        value_element(param_input, "uid", self.new_uid())
+        value_element(param_input, "type", sbs_types[input_type])
+        value_element(ET.SubElement(param_input, "defaultValue"), constant_value_tags[input_type],
+                      default_values[input_type])
+
+        return param_input
+
+    def add_function(self, graph_id: str, ir_graph: IRGraph, inputs: list = None) -> ET.Element:
+        """Add function graph [graph_id] with the nodes of [ir_graph] and [inputs] ([(id, type)], see function_inputs())"""
+        function = ET.Element("function")
+        value_element(function, "identifier", graph_id)
+        value_element(function, "uid", self.new_uid())
+
+        output_type = ir_graph.output.type if ir_graph.output is not None else None
+        if output_type in sbs_types:
+            value_element(function, "type", sbs_types[output_type])
+
+        if inputs:
+            param_inputs = ET.SubElement(function, "paramInputs")
+            for input_id, input_type in inputs:
+                self.input_element(param_inputs, input_id, input_type)
+
+        dynamic_value = ET.SubElement(ET.SubElement(function, "paramValue"), "dynamicValue")
+        nodes = ET.SubElement(dynamic_value, "nodes")
+
+        uids = {node.index: self.new_uid() for node in ir_graph.nodes}
+        positions = layered_layout(ir_graph, grid_size)
+        for node in ir_graph.nodes:
+            self.node_element(nodes, node, positions[node.index], uids)
+
+        if ir_graph.output is not None:
+            value_element(dynamic_value, "rootnode", uids[ir_graph.output.index])
+
+        self.functions.append(function)
+        return function
+
+    def package_element(self) -> ET.Element:
+        package = ET.Element("package")
+        value_element(package, "identifier", "Unsaved Package")
+        value_element(package, "formatVersion", format_version)
+        value_element(package, "updaterVersion", format_version)
+        value_element(package, "fileUID", "{" + str(uuid.uuid4()) + "}")
+        value_element(package, "versionUID", 0)
+
+        if self.dependencies:
+            dependencies = ET.SubElement(package, "dependencies")
+            for dependency_uid, filename in self.dependencies.items():
+                dependency = ET.SubElement(dependencies, "dependency")
+                value_element(dependency, "filename", filename)
+                value_element(dependency, "uid", dependency_uid)
+                value_element(dependency, "type", "package")
+                value_element(dependency, "fileUID", 0)
+                value_element(dependency, "versionUID", 0)
+
+        content = ET.SubElement(package, "content")
+        content.extend(self.functions)
+
+        return package
+
+    def write(self, path: str):
+        ET.ElementTree(self.package_element()).write(path, encoding="UTF-8", xml_declaration=True)
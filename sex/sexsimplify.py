@@ -0,0 +1,103 @@
+from sexfold import components
+from sextypes import type_info
+
+
+def is_constant_value(constant: tuple, value) -> bool:
+    return constant is not None and all(c == value for c in components(constant[1]))
+
+
+def same_type_constant(value_type: str, value) -> tuple:
+    base_type, num_components = type_info(value_type)
+    value = float(value) if base_type == "float" else int(value)
+    return value_type, value if num_components == 1 else (value,) * num_components
+
+
+def simplify_node(definition: str, node_type: str, inputs: dict, constants: dict):
+    """Rewrite arithmetic identities and annihilators of SD node [definition].
+
+    [inputs] are the input nodes and [constants] their constant values (None for non constants).
+    Returns the node to use instead (one of the inputs or their inputs), a (type, value)
+    constant to create or None if nothing can be simplified.
+    Rewrites follow the algebra of finite values (x * 0.0 is 0.0 even for infinite x).
+    Inputs with side effects (setting variables) are never dropped.
+    """
+    if definition is None or node_type is None:
+        return None
+
+    def operand(name: str):
+        node = inputs.get(name)
+        return node if node is not None and node.type == node_type else None
+
+    def is_zero(name: str) -> bool:
+        return is_constant_value(constants.get(name), 0)
+
+    def is_one(name: str) -> bool:
+        return is_constant_value(constants.get(name), 1)
+
+    def can_drop(*names) -> bool:
+        return not any(inputs[name].side_effects for name in names if inputs.get(name) is not None)
+
+    if definition == "sbs::function::add":
+        if is_zero("b"):
+            return operand("a")
+        if is_zero("a"):
+            return operand("b")
+
+    elif definition == "sbs::function::sub":
+        if is_zero("b"):
+            return operand("a")
+
+    elif definition == "sbs::function::mul":
+        if is_one("b"):
+            return operand("a")
+        if is_one("a"):
+            return operand("b")
+        if (is_zero("a") or is_zero("b")) and can_drop("a", "b"):
+            return same_type_constant(node_type, 0)
+
+    elif definition == "sbs::function::mulscalar":
+        if is_one("scalar"):
+            return operand("a")
+        if (is_zero("scalar") or is_zero("a")) and can_drop("a", "scalar"):
+            return same_type_constant(node_type, 0)
+
+    elif definition == "sbs::function::div":
+        if is_one("b"):
+            return operand("a")
+
+    elif definition in ("sbs::function::neg", "sbs::function::not"):
+        operand_node = inputs.get("a")
+        if operand_node is not None and operand_node.definition == definition:
+            return operand_node.inputs.get("a")
+
+    elif definition in ("sbs::function::min", "sbs::function::max"):
+        if inputs.get("a") is inputs.get("b"):
+            return operand("a")
+
+    elif definition == "sbs::function::lerp":
+        if inputs.get("a") is inputs.get("b") or (is_zero("x") and can_drop("b")):
+            return operand("a")
+
+    elif definition == "sbs::function::ifelse":
+        condition = constants.get("condition")
+        if condition is not None:
+            return operand("ifpath") if condition[1] else operand("elsepath")
+        if inputs.get("ifpath") is inputs.get("elsepath"):
+            return operand("ifpath")
+
+    elif definition in ("sbs::function::and", "sbs::function::or") and inputs.get("a") is inputs.get("b"):
+        return operand("a")
+
+    elif definition == "sbs::function::and":
+        for name, other in (("a", "b"), ("b", "a")):
+            constant = constants.get(name)
+            if constant is not None and (constant[1] or can_drop(other)):
+                return operand(other) if constant[1] else ("bool", False)
+
+    elif definition == "sbs::function::or":
+        for name, other in (("a", "b"), ("b", "a")):
+            constant = constants.get(name)
+            if constant is not None and (not constant[1] or can_drop(other)):
+                return ("bool", True) if constant[1] else operand(other)
+
+    return None
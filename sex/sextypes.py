@@ -0,0 +1,192 @@
+float_types = ("float", "float2", "float3", "float4")
+int_types = ("int", "int2", "int3", "int4")
+numeric_types = float_types + int_types
+scalar_types = ("float", "int")
+any_types = numeric_types + ("bool", "string")
+
+# Signature input specs:
+#   "float"            - exact type
+#   poly(types)        - binds type variable T to the received type (has to be one of [types])
+#   T                  - has to be the same type bound to T before
+#   None               - not checked
+# Output spec is an exact type or T
+
+T = "T"
+
+
+def poly(types: tuple) -> tuple:
+    return (T, types)
+
+
+def op_signature(types: tuple, *input_names: str, output=T) -> tuple:
+    first_input, *other_inputs = input_names
+    return [(first_input, poly(types))] + [(name, T) for name in other_inputs], output
+
+
+signatures = {
+    # operators
+    "sbs::function::add": op_signature(numeric_types, "a", "b"),
+    "sbs::function::sub": op_signature(numeric_types, "a", "b"),
+    "sbs::function::mul": op_signature(numeric_types, "a", "b"),
+    "sbs::function::div": op_signature(numeric_types, "a", "b"),
+    "sbs::function::mod": op_signature(numeric_types, "a", "b"),
+    "sbs::function::mulscalar": ([("a", poly(float_types)), ("scalar", "float")], T),
+    "sbs::function::dot": op_signature(float_types, "a", "b", output="float"),
+    "sbs::function::neg": op_signature(numeric_types, "a"),
+    "sbs::function::not": ([("a", "bool")], "bool"),
+    "sbs::function::and": ([("a", "bool"), ("b", "bool")], "bool"),
+    "sbs::function::or": ([("a", "bool"), ("b", "bool")], "bool"),
+    "sbs::function::gt": op_signature(scalar_types, "a", "b", output="bool"),
+    "sbs::function::gteq": op_signature(scalar_types, "a", "b", output="bool"),
+    "sbs::function::lr": op_signature(scalar_types, "a", "b", output="bool"),
+    "sbs::function::lreq": op_signature(scalar_types, "a", "b", output="bool"),
+    "sbs::function::eq": op_signature(scalar_types, "a", "b", output="bool"),
+    "sbs::function::noteq": op_signature(scalar_types, "a", "b", output="bool"),
+    "sbs::function::ifelse": ([("condition", "bool"), ("ifpath", poly(any_types)), ("elsepath", T)], T),
+
+    # functions
+    "sbs::function::abs": op_signature(numeric_types, "a"),
+    "sbs::function::floor": op_signature(float_types, "a"),
+    "sbs::function::ceil": op_signature(float_types, "a"),
+    "sbs::function::cos": op_signature(float_types, "a"),
+    "sbs::function::sin": op_signature(float_types, "a"),
+    "sbs::function::tan": op_signature(float_types, "a"),
+    "sbs::function::atan2": ([("a", "float2")], "float"),
+    "sbs::function::cartesian": ([("rho", "float"), ("theta", "float")], "float2"),
+    "sbs::function::sqrt": op_signature(float_types, "a"),
+    "sbs::function::log": op_signature(float_types, "a"),
+    "sbs::function::exp": op_signature(float_types, "a"),
+    "sbs::function::log2": op_signature(float_types, "a"),
+    "sbs::function::pow2": op_signature(float_types, "a"),
+    "sbs::function::lerp": ([("a", poly(float_types)), ("b", T), ("x", "float")], T),
+    "sbs::function::min": op_signature(numeric_types, "a", "b"),
+    "sbs::function::max": op_signature(numeric_types, "a", "b"),
+    "sbs::function::rand": ([("a", "float")], "float"),
+
+    # samplers
+    "sbs::function::samplelum": ([("pos", "float2")], "float"),
+    "sbs::function::samplecol": ([("pos", "float2")], "float4"),
+
+    # variables
+    "sbs::function::set": op_signature(any_types, "value"),
+    "sbs::function::sequence": ([("seqin", None), ("seqlast", poly(any_types))], T),
+    "sbs::function::get_float1": ([], "float"),
+    "sbs::function::get_float2": ([], "float2"),
+    "sbs::function::get_float3": ([], "float3"),
+    "sbs::function::get_float4": ([], "float4"),
+    "sbs::function::get_integer1": ([], "int"),
+    "sbs::function::get_integer2": ([], "int2"),
+    "sbs::function::get_integer3": ([], "int3"),
+    "sbs::function::get_integer4": ([], "int4"),
+    "sbs::function::get_bool": ([], "bool"),
+    "sbs::function::get_string": ([], "string"),
+}
+
+for _num_components, (_float_type, _int_type) in enumerate(zip(float_types, int_types), start=1):
+    _suffix = _num_components if _num_components > 1 else ""
+    signatures[f"sbs::function::tofloat{_suffix}"] = ([("value", _int_type)], _float_type)
+    signatures[f"sbs::function::toint{_num_components}"] = ([("value", _float_type)], _int_type)
+    signatures[f"sbs::function::const_float{_num_components}"] = ([], _float_type)
+    signatures[f"sbs::function::const_int{_num_components}"] = ([], _int_type)
+
+signatures["sbs::function::const_bool"] = ([], "bool")
+
+
+class TypeCheckError(Exception):
+    pass
+
+
+def type_info(value_type: str) -> tuple:
+    if value_type[-1].isdigit():
+        return value_type[:-1], int(value_type[-1])
+    return value_type, 1
+
+
+def make_type(base_type: str, num_components: int) -> str:
+    return base_type if num_components == 1 else f"{base_type}{num_components}"
+
+
+def mismatch(input_index: int, expected, received: str) -> TypeCheckError:
+    if not isinstance(expected, str):
+        expected = " or ".join(expected)
+    return TypeCheckError(f"Type mismatch for parameter [{input_index + 1}]: {expected} was expected ({received} was received)")
+
+
+def check_signature(signature: tuple, input_types: dict) -> str:
+    """Check [input_types] ({input id: type}) against [signature] and return the output type.
+
+    Unknown (None) types are never reported so the check can't be stricter than SD itself.
+    """
+    inputs, output = signature
+    bound_type = None
+
+    for input_index, (input_name, spec) in enumerate(inputs):
+        received = input_types.get(input_name)
+        if spec is None or received is None:
+            continue
+
+        if spec == T:
+            if bound_type is None:
+                bound_type = received
+            elif received != bound_type:
+                raise mismatch(input_index, bound_type, received)
+
+        elif isinstance(spec, tuple):
+            _, allowed = spec
+            if received not in allowed:
+                raise mismatch(input_index, allowed, received)
+            bound_type = received
+
+        elif received != spec:
+            raise mismatch(input_index, spec, received)
+
+    return bound_type if output == T else output
+
+
+def check_vector(base_type: str, num_components: int, input_types: dict) -> str:
+    components_num = 0
+
+    for input_index, input_name in enumerate(("componentsin", "componentslast")):
+        received = input_types.get(input_name)
+        if received is None:
+            return make_type(base_type, num_components)
+
+        received_base, received_components = type_info(received)
+        if received_base != base_type:
+            raise mismatch(input_index, [make_type(base_type, n) for n in range(1, num_components)], received)
+
+        components_num += received_components
+
+    if components_num != num_components:
+        raise TypeCheckError(f"Vector components mismatch: {num_components} components were expected ({components_num} were received)")
+
+    return make_type(base_type, num_components)
+
+
+def check_swizzle(base_type: str, num_components: int, input_types: dict) -> str:
+    received = input_types.get("vector")
+    if received is not None and type_info(received)[0] != base_type:
+        raise mismatch(0, [make_type(base_type, n) for n in range(1, 5)], received)
+
+    return make_type(base_type, num_components)
+
+
+def infer_type(definition: str, input_types: dict) -> str:
+    """Output type of built-in node [definition] or None if it can't be inferred"""
+    if definition in signatures:
+        return check_signature(signatures[definition], input_types)
+
+    name = definition[len("sbs::function::"):]
+
+    if name[:-1] in ("vector", "ivector"):
+        return check_vector("float" if name.startswith("vector") else "int", int(name[-1]), input_types)
+
+    if name[:-1] in ("swizzle", "iswizzle"):
+        return check_swizzle("float" if name.startswith("swizzle") else "int", int(name[-1]), input_types)
+
+    return None
+
+
+def function_signature(input_names: list, input_types: list, output_type: str) -> tuple:
+    """Signature of an imported function graph"""
+    return list(zip(input_names, input_types)), output_type
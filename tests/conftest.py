@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules of the plugin import each other by name as SD puts the plugin directory on sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sex"))
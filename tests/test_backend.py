@@ -0,0 +1,46 @@
+from sexbackend import MemoryGraphBackend
+
+
+def test_deleting_a_node_removes_its_connections():
+    backend = MemoryGraphBackend()
+    x = backend.new_node("sbs::function::get_float1")
+    sin = backend.new_node("sbs::function::sin")
+    add = backend.new_node("sbs::function::add")
+    backend.connect(x, sin, "a")
+    backend.connect(sin, add, "a")
+    backend.connect(x, add, "b")
+    backend.set_output_node(sin)
+
+    backend.delete_node(sin)
+
+    assert add.inputs == {"b": x}
+    assert x.consumers == {(add, "b")}
+    assert backend.get_output_node() is None
+
+
+def test_connecting_replaces_the_input():
+    backend = MemoryGraphBackend()
+    x = backend.new_node("sbs::function::get_float1")
+    y = backend.new_node("sbs::function::get_float1")
+    sin = backend.new_node("sbs::function::sin")
+    backend.connect(x, sin, "a")
+    backend.connect(y, sin, "a")
+
+    assert sin.inputs == {"a": y}
+    assert not x.consumers
+
+
+def test_state_and_calls():
+    backend = MemoryGraphBackend()
+    x = backend.new_node("sbs::function::get_float1")
+    backend.set_constant(x, ("string", "x"))
+    backend.set_output_node(x)
+
+    state = backend.read_state()
+    assert [(r.id, r.kind, r.constant, r.inputs) for r in state.records] == \
+        [(x.id, "sbs::function::get_float1", ("string", "x"), {})]
+    assert state.output == x.id
+    assert backend.state_matches(state)
+
+    assert backend.calls == {"new_node": 1, "set_constant": 1, "set_output_node": 1, "read_state": 1, "state_matches": 1}
+    assert backend.api_calls == 5
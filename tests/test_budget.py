@@ -0,0 +1,45 @@
+import ast
+
+import pytest
+
+from sexcompiler import Compiler, ParserError, render_source_lines
+
+src = """p = get_float2("$pos")
+v = p.x
+{% for i in range(20) %}
+v = sin(v * {{ i }}.5)
+{% endfor %}
+_OUT_ = v
+"""
+
+
+def compile_src() -> tuple:
+    rendered, source_lines = render_source_lines(src, ".")
+    compiler = Compiler()
+    return compiler, compiler.compile_module(ast.parse(rendered)), source_lines
+
+
+def test_within_budget():
+    compiler, ir_graph, _ = compile_src()
+    compiler.check_budget(ir_graph, len(ir_graph), ir_graph.connections_num())
+    compiler.check_budget(ir_graph, 0, 0)
+
+
+def test_over_budget_lists_snippet_lines():
+    compiler, ir_graph, source_lines = compile_src()
+
+    with pytest.raises(ParserError) as err:
+        compiler.check_budget(ir_graph, 10, 0, source_lines)
+
+    report = str(err.value).splitlines()
+    assert f"Graph has {len(ir_graph)} nodes" in report[0]
+    assert "rendered" not in report[0]
+    # the loop body renders into 20 lines which are all line 4 of the snippet
+    assert report[1] == "    line 4: 60 nodes, 60 connections"
+
+
+def test_connection_budget():
+    compiler, ir_graph, _ = compile_src()
+
+    with pytest.raises(ParserError, match="budget of 5 connections"):
+        compiler.check_budget(ir_graph, 0, 5)
@@ -0,0 +1,49 @@
+import json
+import re
+
+import pytest
+
+import sexcli
+from sexcompiler import ParserError, compile_source
+
+src = """
+p = get_float2("$pos")
+_OUT_ = sin(p.x * 2.0) + p.y
+"""
+
+
+def test_compile_source():
+    result = compile_source(src)
+    graph = result["graph"]
+
+    assert result["stats"]["nodes"] == len(graph["nodes"])
+    assert graph["nodes"][graph["output"]]["definition"] == "sbs::function::add"
+    assert graph["nodes"][graph["output"]]["snippet_line"] == 3
+
+
+def test_cli_writes_graph(tmp_path):
+    source_path = tmp_path / "snippet.sex"
+    source_path.write_text(src)
+    output_path = tmp_path / "snippet.json"
+
+    assert sexcli.main([str(source_path), "-o", str(output_path)]) == 0
+    assert json.loads(output_path.read_text())["graph"] == compile_source(src)["graph"]
+
+
+def test_cli_reports_errors(tmp_path, capsys):
+    source_path = tmp_path / "snippet.sex"
+    source_path.write_text("_OUT_ = undefined_variable\n")
+
+    assert sexcli.main([str(source_path)]) == 1
+    assert str(source_path) in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("expression, symbol", [
+    ("1.0 + 2.0 ** 3.0", "**"),
+    ("get_int(\"$n\") // 2", "//"),
+    ("-+get_float(\"$x\")", "unary +"),
+    ("1.0 if 1 in 2 else 0.0", "in"),
+])
+def test_unsupported_operators(expression, symbol):
+    with pytest.raises(ParserError, match=f"Operator {re.escape(symbol)} is not supported"):
+        compile_source(f"_OUT_ = {expression}\n")
@@ -0,0 +1,67 @@
+import ast
+
+from sexbackend import MemoryGraphBackend
+from sexcompiler import Compiler, load_signatures
+from sexemit import GraphEmitter, compile_cache_size
+
+signatures = {
+    "functions": {
+        "noise": {"inputs": [["x", "float2"]], "output": "float"},
+        "other": {"inputs": [["x", "float"]], "output": "float"},
+    },
+    "graphs": {"ramp": [["position", "float"]]},
+}
+
+src = 'declare_inputs("ramp")\n_OUT_ = noise(get_float2("$pos")) * get_float("position")\n'
+
+
+def signed_compiler(changes: dict = None) -> Compiler:
+    compiler = Compiler()
+    load_signatures(compiler, signatures)
+    if changes:
+        load_signatures(compiler, changes)
+    return compiler
+
+
+def test_key_depends_on_source():
+    compiler = signed_compiler()
+    assert compiler.compile_key(src) == signed_compiler().compile_key(src)
+    assert compiler.compile_key(src) != compiler.compile_key(src.replace("$pos", "$size"))
+
+
+def test_key_depends_on_called_functions_only():
+    key = signed_compiler().compile_key(src)
+    assert signed_compiler({"functions": {"noise": {"inputs": [["x", "float3"]], "output": "float"}}}).compile_key(src) != key
+    assert signed_compiler({"functions": {"other": {"inputs": [["x", "int"]], "output": "float"}}}).compile_key(src) == key
+
+
+def test_key_depends_on_declared_graph_inputs():
+    key = signed_compiler().compile_key(src)
+    assert signed_compiler({"graphs": {"ramp": [["position", "float2"]]}}).compile_key(src) != key
+    assert signed_compiler({"graphs": {"unrelated": [["x", "float"]]}}).compile_key(src) == key
+
+
+def test_cached_compile_is_reused():
+    emitter = GraphEmitter(MemoryGraphBackend())
+    expr_tree = ast.parse('_OUT_ = sin(get_float("$time"))\n')
+
+    compiled = emitter.compile_graph(expr_tree, "key")
+    assert emitter.compile_graph(None, "key") is compiled
+    assert emitter.messages[-1] == "Compiled graph is restored from cache"
+
+    for index in range(compile_cache_size):
+        emitter.compile_graph(expr_tree, f"key{index}")
+    assert "key" not in emitter.compile_cache
+    assert len(emitter.compile_cache) == compile_cache_size
+
+
+def test_emit_with_the_same_key_only_checks_the_graph():
+    backend = MemoryGraphBackend()
+    emitter = GraphEmitter(backend)
+    expr_tree = ast.parse('_OUT_ = sin(get_float("$time"))\n')
+
+    emitter.emit_compiled(emitter.compile_graph(expr_tree, "key"), compile_key="key")
+    backend.calls.clear()
+    emitter.emit_compiled(emitter.compile_graph(None, "key"), graph_key="key", compile_key="key")
+
+    assert backend.calls == {"state_matches": 1}
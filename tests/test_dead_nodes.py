@@ -0,0 +1,45 @@
+import ast
+
+from sexcompiler import Compiler
+from sexir import IRGraph
+
+
+def test_dead_nodes_are_removed():
+    src = """
+p = get_float2("$pos")
+unused = cos(p.y) * 3.0
+_OUT_ = sin(p.x)
+"""
+    compiler = Compiler()
+    ir_graph = compiler.compile_module(ast.parse(src))
+
+    assert [node.definition for node in ir_graph.nodes] == \
+        ["sbs::function::get_float2", "sbs::function::swizzle1", "sbs::function::sin"]
+    assert ir_graph.removed_nodes_num == 4
+    assert [node.index for node in ir_graph.nodes] == [0, 1, 2]
+    assert compiler.unused_vars == [("unused", 3)]
+
+
+def test_every_unread_variable_is_reported():
+    src = """
+a = get_float("$time")
+b = a * 2.0
+c = 1.0
+_OUT_ = a
+"""
+    compiler = Compiler()
+    compiler.compile_module(ast.parse(src))
+    assert compiler.unused_vars == [("b", 3), ("c", 4)]
+
+
+def test_removed_nodes_are_not_merged_into():
+    ir_graph = IRGraph()
+    x = ir_graph.add_node("sbs::function::get_float1", constant=("string", "x"))
+    ir_graph.add_node("sbs::function::cos", {"a": x})
+    ir_graph.output = ir_graph.add_node("sbs::function::sin", {"a": x})
+
+    ir_graph.eliminate_dead_nodes()
+    ir_graph.add_node("sbs::function::cos", {"a": x})
+
+    assert ir_graph.merged_nodes_num == 0
+    assert [node.definition for node in ir_graph.nodes][-1] == "sbs::function::cos"
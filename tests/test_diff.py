@@ -0,0 +1,66 @@
+import ast
+
+from sexbackend import MemoryGraphBackend
+from sexdiff import GraphState, NodeRecord, diff_graph, structure_ids, topological_order
+from sexemit import GraphEmitter
+
+base_src = """
+p = get_float2("$pos")
+s = sin(p.x * 2.0)
+_OUT_ = s + p.y
+"""
+
+edited_src = """
+p = get_float2("$pos")
+s = sin(p.y * 3.0) + 1.0
+_OUT_ = s * p.x
+"""
+
+
+def emit(backend: MemoryGraphBackend, *sources):
+    emitter = GraphEmitter(backend)
+    for src in sources:
+        emitter.parse_module(ast.parse(src))
+    return backend
+
+
+def canonical_graph(backend: MemoryGraphBackend, interned: dict) -> tuple:
+    """Node structures of the graph independent from node ids (graphs have to share [interned])"""
+    state = backend.read_state()
+    records = topological_order(state.records)
+    ids = structure_ids(records, interned, True)
+    return sorted(ids[r.id] for r in records), ids[state.output]
+
+
+def test_incremental_emit_equals_fresh_emit():
+    incremental = emit(MemoryGraphBackend(), base_src, edited_src)
+    fresh = emit(MemoryGraphBackend(), edited_src)
+
+    interned = {}
+    assert canonical_graph(incremental, interned) == canonical_graph(fresh, interned)
+
+
+def test_constant_change_sets_one_constant():
+    backend = emit(MemoryGraphBackend(), base_src)
+    backend.calls.clear()
+    emit(backend, base_src.replace("2.0", "5.0"))
+
+    assert backend.calls == {"read_state": 1, "set_constant": 1}
+
+
+def test_unchanged_graph_has_empty_diff():
+    records = [NodeRecord(0, "a"), NodeRecord(1, "b", ("float", 1.0), {"x": 0})]
+    old_state = GraphState([NodeRecord(10, "a"), NodeRecord(11, "b", ("float", 1.0), {"x": 10})], 11)
+
+    diff = diff_graph(records, 1, old_state)
+    assert diff.is_empty()
+    assert diff.matched == {0: 10, 1: 11}
+
+
+def test_removed_nodes_are_deleted():
+    records = [NodeRecord(0, "a")]
+    old_state = GraphState([NodeRecord(10, "a"), NodeRecord(11, "b", None, {"x": 10})], 11)
+
+    diff = diff_graph(records, 0, old_state)
+    assert diff.deleted == [11]
+    assert diff.output_changed
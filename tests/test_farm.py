@@ -0,0 +1,50 @@
+import json
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+from sexfarm import CompileCache, compile_directory
+
+src = '_OUT_ = sin(get_float("$time"))\n'
+
+
+def compile_tree(root, failures: dict = None) -> dict:
+    cache = CompileCache(str(root / ".sexcache"), "context")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        return compile_directory(str(root), executor, cache, failures=failures)
+
+
+def test_sources_are_compiled_once(tmp_path):
+    (tmp_path / "a.sex").write_text(src)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.sex").write_text(src)
+
+    assert compile_tree(tmp_path) == {"compiled": 2, "cached": 0, "failed": 0}
+    assert "graph" in json.loads((tmp_path / "sub" / "b.json").read_text())
+    assert compile_tree(tmp_path) == {"compiled": 0, "cached": 2, "failed": 0}
+
+    (tmp_path / "a.sex").write_text(src.replace("sin", "cos"))
+    assert compile_tree(tmp_path) == {"compiled": 1, "cached": 1, "failed": 0}
+
+
+def test_changed_include_recompiles(tmp_path):
+    (tmp_path / "common.jinja").write_text("{% macro value() %}1.0{% endmacro %}")
+    (tmp_path / "a.sex").write_text('{% import "common.jinja" as common %}\n_OUT_ = {{ common.value() }}\n')
+    compile_tree(tmp_path)
+
+    (tmp_path / "common.jinja").write_text("{% macro value() %}2.0{% endmacro %}")
+    assert compile_tree(tmp_path) == {"compiled": 1, "cached": 0, "failed": 0}
+
+
+def test_failed_source_is_retried_when_its_include_appears(tmp_path, capsys):
+    (tmp_path / "a.sex").write_text('_OUT_ = {% include "missing.jinja" %}\n')
+    (tmp_path / "b.sex").write_text("_OUT_ = 1.0 +\n")
+    failures = {}
+
+    assert compile_tree(tmp_path, failures) == {"compiled": 0, "cached": 0, "failed": 2}
+    assert compile_tree(tmp_path, failures) == {"compiled": 0, "cached": 0, "failed": 0}
+    assert "a.sex" in capsys.readouterr().err
+
+    (tmp_path / "missing.jinja").write_text("1.0")
+    assert compile_tree(tmp_path, failures) == {"compiled": 1, "cached": 0, "failed": 0}
+    assert sorted(os.path.basename(path) for path in failures) == ["b.sex"]
@@ -0,0 +1,36 @@
+import ast
+
+from sexcompiler import Compiler
+from sexfold import fold_constants
+
+
+def test_binary_arithmetic():
+    assert fold_constants("sbs::function::add", None, {"a": ("float", 1.5), "b": ("float", 2.0)}) == ("float", 3.5)
+    assert fold_constants("sbs::function::mul", None, {"a": ("float2", (1.0, 2.0)), "b": ("float2", (3.0, 4.0))}) == \
+        ("float2", (3.0, 8.0))
+
+
+def test_integer_division_is_not_folded():
+    assert fold_constants("sbs::function::div", None, {"a": ("int", 7), "b": ("int", 2)}) is None
+
+
+def test_division_by_zero_is_not_folded():
+    assert fold_constants("sbs::function::div", None, {"a": ("float", 1.0), "b": ("float", 0.0)}) is None
+
+
+def test_unary_and_compare():
+    assert fold_constants("sbs::function::neg", None, {"a": ("float", 2.0)}) == ("float", -2.0)
+    assert fold_constants("sbs::function::gt", None, {"a": ("float", 2.0), "b": ("float", 1.0)}) == ("bool", True)
+
+
+def test_non_constant_inputs_are_not_folded():
+    assert fold_constants("sbs::function::add", None, {"a": ("float", 1.0)}) is None
+    assert fold_constants("sbs::function::sin", None, {"a": ("float", 0.0)}) is None
+    assert fold_constants(None, None, {}) is None
+
+
+def test_constant_expressions_compile_to_one_constant():
+    ir_graph = Compiler().compile_module(ast.parse("_OUT_ = vector2(1.0 + 2.0, 4.0) * vector2(0.5, 0.5)\n"))
+
+    assert [node.definition for node in ir_graph.nodes] == ["sbs::function::const_float2"]
+    assert ir_graph.output.constant == ("float2", (1.5, 2.0))
@@ -0,0 +1,66 @@
+import json
+import os
+
+from sexindex import FunctionIndex, function_alias, index_version
+
+signature = {"inputs": [["x", "float2"]], "output": "float"}
+
+
+def package(tmp_path, name: str = "lib.sbs") -> str:
+    path = tmp_path / name
+    path.write_text("<package/>")
+    return str(path)
+
+
+def test_signatures_are_kept_across_sessions(tmp_path):
+    index_path = str(tmp_path / "index.json")
+    package_path = package(tmp_path)
+
+    index = FunctionIndex(index_path)
+    assert index.functions(package_path, ["noise"]) == {}
+    index.store(package_path, "noise", signature)
+    index.save()
+
+    assert FunctionIndex(index_path).functions(package_path, ["noise"]) == {"noise": signature}
+
+
+def test_changed_package_is_dropped(tmp_path):
+    index = FunctionIndex(str(tmp_path / "index.json"))
+    package_path = package(tmp_path)
+    index.functions(package_path, ["noise"])
+    index.store(package_path, "noise", signature)
+
+    # other function graphs
+    assert index.functions(package_path, ["noise", "ramp"]) == {}
+    index.store(package_path, "noise", signature)
+
+    # saved again
+    mtime = os.path.getmtime(package_path)
+    os.utime(package_path, (mtime + 10, mtime + 10))
+    assert index.functions(package_path, ["ramp", "noise"]) == {}
+
+
+def test_unsaved_package_is_not_indexed(tmp_path):
+    index = FunctionIndex(str(tmp_path / "index.json"))
+    assert index.functions(str(tmp_path / "missing.sbs"), ["noise"]) == {}
+    index.store(str(tmp_path / "missing.sbs"), "noise", signature)
+
+    index.save()
+    assert not os.path.exists(index.path)
+
+
+def test_index_of_other_version_is_discarded(tmp_path):
+    index_path = tmp_path / "index.json"
+    package_path = package(tmp_path)
+    index_path.write_text(json.dumps({"version": index_version - 1, "packages": {
+        package_path: {"mtime": os.path.getmtime(package_path), "ids": ["noise"], "functions": {"noise": signature}}}}))
+
+    assert FunctionIndex(str(index_path)).functions(package_path, ["noise"]) == {}
+
+    index_path.write_text("{broken")
+    assert FunctionIndex(str(index_path)).packages == {}
+
+
+def test_function_alias():
+    assert function_alias("Noise(Perlin).v2") == "NoisePerlinv2"
+    assert function_alias("3D-Noise", to_lower_case=True) == "_3dnoise"
@@ -0,0 +1,68 @@
+import ast
+
+import pytest
+
+from sexcompiler import Compiler
+from sexindex import FunctionTable, UnresolvedFunction
+from sextypes import function_signature
+
+
+class Resolver:
+    """Counts how many times a function is resolved"""
+
+    def __init__(self, input_types: list = None, output_type: str = "float"):
+        self.input_types = input_types if input_types is not None else ["float"]
+        self.output_type = output_type
+        self.calls = 0
+
+    def __call__(self) -> tuple:
+        self.calls += 1
+        input_names = [f"in{i}" for i in range(len(self.input_types))]
+        return None, input_names, function_signature(input_names, self.input_types, self.output_type)
+
+
+def test_functions_are_resolved_once_on_first_lookup():
+    noise, ramp = Resolver(), Resolver()
+    table = FunctionTable()
+    table.add("noise", noise)
+    table.add("ramp", ramp)
+
+    assert "noise" in table and len(table) == 2
+    assert noise.calls == 0
+
+    table["noise"]
+    table["noise"]
+    assert (noise.calls, ramp.calls) == (1, 0)
+
+
+def test_only_called_functions_are_resolved_by_the_compiler():
+    noise, ramp = Resolver(), Resolver()
+    compiler = Compiler()
+    compiler.imported_functions = FunctionTable()
+    compiler.imported_functions.add("noise", noise)
+    compiler.imported_functions.add("ramp", ramp)
+
+    compiler.compile_module(ast.parse('_OUT_ = noise(get_float("$time"))\n'))
+    assert (noise.calls, ramp.calls) == (1, 0)
+
+
+def test_offline_copy():
+    indexed, resolved, pending = Resolver(), Resolver(), Resolver()
+    table = FunctionTable()
+    table.add("indexed", indexed, offline=True)
+    table.add("resolved", resolved)
+    table.add("pending", pending)
+    table["resolved"]
+
+    offline = table.offline_copy()
+    offline["indexed"]
+    offline["resolved"]
+    assert (indexed.calls, resolved.calls) == (1, 1)
+
+    with pytest.raises(UnresolvedFunction) as err:
+        offline["pending"]
+    assert err.value.alias == "pending"
+    assert pending.calls == 0
+
+    table.resolve(["pending", "unknown"])
+    assert pending.calls == 1
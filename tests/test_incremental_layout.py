@@ -0,0 +1,57 @@
+import ast
+
+from sexbackend import MemoryGraphBackend
+from sexcompiler import Compiler
+from sexemit import GraphEmitter
+from sexlayout import incremental_layout, layered_layout
+
+src = """
+p = get_float2("$pos")
+a = sin(p.x * 2.0)
+b = cos(p.y)
+_OUT_ = a + b * p.x
+"""
+
+
+def big_src(terms: int, extra: str = "") -> str:
+    lines = ['p = get_float2("$pos")', "v = p.x"]
+    lines += [f"v = sin(v * {i}.5) + p.y" for i in range(terms)]
+    lines.append(f"_OUT_ = v{extra}")
+    return "\n".join(lines) + "\n"
+
+
+def test_kept_positions_are_not_moved():
+    ir_graph = Compiler().compile_module(ast.parse(src))
+    positions = layered_layout(ir_graph, 100.0)
+    consumers = {node.index: [] for node in ir_graph.nodes}
+    for node in ir_graph.nodes:
+        for input_node in node.inputs.values():
+            consumers[input_node.index].append(node.index)
+
+    new_index = ir_graph.nodes[0].index
+    kept = {index: position for index, position in enumerate(positions) if index != new_index}
+    placed = incremental_layout(ir_graph, {new_index: consumers[new_index]}, kept, 100.0)
+
+    assert set(placed) == {new_index}
+    assert placed[new_index] not in kept.values()
+    assert all(placed[new_index][0] < kept[consumer][0] for consumer in consumers[new_index])
+
+
+def test_adding_a_node_reads_only_its_neighbours():
+    backend = MemoryGraphBackend()
+    emitter = GraphEmitter(backend)
+    emitter.emit_compiled(emitter.compile_graph(ast.parse(big_src(100))), compile_key="a")
+    old_positions = {node_id: node.position for node_id, node in backend.nodes.items()}
+
+    backend.calls.clear()
+    emitter.emit_compiled(emitter.compile_graph(ast.parse(big_src(100, " * get_float(\"$time\")"))),
+                          graph_key="a", compile_key="b")
+
+    assert backend.calls["new_node"] == 2
+    assert backend.calls["read_position"] <= 2
+    assert "read_state" not in backend.calls
+
+    positions = [node.position for node in backend.nodes.values()]
+    assert len(set(positions)) == len(positions)
+    assert all(backend.nodes[node_id].position == position for node_id, position in old_positions.items()
+               if node_id in backend.nodes)
@@ -0,0 +1,29 @@
+import ast
+
+from sexcompiler import Compiler
+
+
+def compile_src(src: str):
+    return Compiler().compile_module(ast.parse(src))
+
+
+def constant_nodes(ir_graph) -> list:
+    return [node for node in ir_graph.nodes if node.definition == "sbs::function::const_float1"]
+
+
+def test_equal_literals_share_one_node():
+    ir_graph = compile_src('p = get_float2("$pos")\n_OUT_ = p.x * 2.0 + p.y * 2.0 + sin(2.0 * p.x)\n')
+
+    assert len(constant_nodes(ir_graph)) == 1
+    assert ir_graph.interned_constants_num == 2
+
+
+def test_signed_zeros_are_distinct():
+    ir_graph = compile_src('p = get_float2("$pos")\n_OUT_ = max(p.x, 0.0) + max(p.y, -0.0)\n')
+    assert sorted(node.constant[1].hex() for node in constant_nodes(ir_graph)) == ["-0x0.0p+0", "0x0.0p+0"]
+
+
+def test_literals_of_other_types_are_distinct():
+    ir_graph = compile_src('_OUT_ = tofloat(get_int("$number") + 1) + get_float("$time") * 1.0 + 1.0\n')
+    constants = sorted(node.constant for node in ir_graph.nodes if node.constant is not None and node.constant[0] != "string")
+    assert constants == [("float", 1.0), ("int", 1)]
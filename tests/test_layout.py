@@ -0,0 +1,104 @@
+import ast
+import itertools
+
+from sexbackend import MemoryGraphBackend
+from sexcompiler import Compiler
+from sexemit import GraphEmitter
+from sexir import IRGraph
+from sexlayout import LayeredGraph, column_crossings, layered_layout, minimize_crossings, node_layers
+
+src = """
+p = get_float2("$pos")
+a = sin(p.x * 2.0)
+b = cos(p.y)
+_OUT_ = a + b * p.x
+"""
+
+
+def compile_graph():
+    return Compiler().compile_module(ast.parse(src))
+
+
+def test_output_is_rightmost():
+    ir_graph = compile_graph()
+    layers = node_layers(ir_graph)
+    positions = layered_layout(ir_graph, 100.0)
+
+    assert layers[ir_graph.output.index] == 0
+    output_x = positions[ir_graph.output.index][0]
+    assert all(x < output_x for node_index, (x, _) in enumerate(positions) if node_index != ir_graph.output.index)
+
+
+def test_inputs_precede_consumers():
+    ir_graph = compile_graph()
+    positions = layered_layout(ir_graph, 100.0)
+
+    assert len(set(positions)) == len(positions)
+    for node in ir_graph.nodes:
+        for input_node in node.inputs.values():
+            assert positions[input_node.index][0] < positions[node.index][0]
+
+
+def test_long_chain():
+    # deep graphs must not hit the recursion limit
+    ir_graph = IRGraph()
+    node = ir_graph.add_node("sbs::function::get_float1", constant=("string", "x"))
+    for _ in range(5000):
+        node = ir_graph.add_node("sbs::function::sin", {"a": node}, mergeable=False)
+    ir_graph.output = node
+
+    layers = node_layers(ir_graph)
+    positions = layered_layout(ir_graph, 100.0)
+
+    assert layers[0] == 5000
+    assert len({x for x, _ in positions}) == 5001
+
+
+def crossing_graph() -> IRGraph:
+    """Two products of functions of the same two inputs taken in opposite order"""
+    ir_graph = IRGraph()
+    x = ir_graph.add_node("sbs::function::get_float1", constant=("string", "x"))
+    y = ir_graph.add_node("sbs::function::get_float1", constant=("string", "y"))
+    a = ir_graph.add_node("sbs::function::sin", {"a": x})
+    b = ir_graph.add_node("sbs::function::cos", {"a": y})
+    c = ir_graph.add_node("sbs::function::sin", {"a": y})
+    d = ir_graph.add_node("sbs::function::cos", {"a": x})
+    ir_graph.output = ir_graph.add_node("sbs::function::add", {
+        "a": ir_graph.add_node("sbs::function::mul", {"a": a, "b": b}),
+        "b": ir_graph.add_node("sbs::function::mul", {"a": c, "b": d})})
+    return ir_graph
+
+
+def total_crossings(graph: LayeredGraph, columns: list) -> int:
+    rows = [0] * len(graph.layers)
+    for column in columns:
+        for row, vertex in enumerate(column):
+            rows[vertex] = row
+    return sum(column_crossings(columns[i], columns[i + 1], graph.inputs, rows) for i in range(len(columns) - 1))
+
+
+def test_column_crossings():
+    # links 0->3 and 1->2 between two columns of two vertices cross once
+    rows = [0, 1, 0, 1]
+    assert column_crossings([0, 1], [2, 3], [[3], [2], [], []], rows) == 1
+    assert column_crossings([0, 1], [2, 3], [[2], [3], [], []], rows) == 0
+
+
+def test_crossings_are_minimized():
+    graph = LayeredGraph(crossing_graph())
+    initial_columns = [list(column) for column in graph.columns]
+    columns = minimize_crossings(graph)
+
+    fewest_crossings = min(total_crossings(graph, list(order))
+                           for order in itertools.product(*(itertools.permutations(c) for c in initial_columns)))
+    assert total_crossings(graph, columns) == fewest_crossings
+
+
+def test_nodes_are_positioned_once_when_created():
+    backend = MemoryGraphBackend()
+    emitter = GraphEmitter(backend)
+    emitter.parse_module(ast.parse(src))
+
+    assert backend.calls["set_position"] == backend.calls["new_node"] == len(backend.nodes)
+    expected = layered_layout(emitter.ir_graph, backend.grid_size)
+    assert [node.position for node in backend.nodes.values()] == expected
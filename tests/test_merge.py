@@ -0,0 +1,36 @@
+import ast
+
+from sexcompiler import Compiler
+
+
+def compile_src(src: str):
+    return Compiler().compile_module(ast.parse(src))
+
+
+def definitions(ir_graph) -> list:
+    return [node.definition for node in ir_graph.nodes]
+
+
+def test_identical_subexpressions_are_merged():
+    ir_graph = compile_src('p = get_float2("$pos")\n_OUT_ = sin(p.x) + sin(p.x)\n')
+
+    assert definitions(ir_graph).count("sbs::function::sin") == 1
+    assert definitions(ir_graph).count("sbs::function::get_float2") == 1
+    assert ir_graph.merged_nodes_num == 2
+
+
+def test_gets_of_set_variables_are_not_merged():
+    src = """
+a = sequence(setvar("v", 1.0), get_float("v"))
+b = sequence(setvar("v", 2.0), get_float("v"))
+_OUT_ = a + b
+"""
+    ir_graph = compile_src(src)
+
+    assert definitions(ir_graph).count("sbs::function::get_float1") == 2
+    assert definitions(ir_graph).count("sbs::function::set") == 2
+
+
+def test_random_nodes_are_not_merged():
+    ir_graph = compile_src("_OUT_ = rand(1.0) + rand(1.0)\n")
+    assert definitions(ir_graph).count("sbs::function::rand") == 2
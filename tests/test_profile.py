@@ -0,0 +1,60 @@
+import ast
+import json
+
+from sexbackend import MemoryGraphBackend
+from sexemit import GraphEmitter
+from sexprofile import Profiler, counted
+
+
+class Item:
+    def __init__(self, value):
+        self.value = value
+
+    def getValue(self):
+        return self.value
+
+    def isSame(self, other) -> bool:
+        return other is self
+
+
+class Array:
+    def __init__(self, items: list):
+        self.items = items
+
+    def getSize(self) -> int:
+        return len(self.items)
+
+    def getItem(self, index: int):
+        return self.items[index]
+
+
+class Counter:
+    api_calls = 0
+
+
+def test_every_call_is_counted():
+    counter = Counter()
+    array = counted(Array([Item(1), Item(2)]), counter)
+
+    assert [item.getValue() for item in array] == [1, 2]
+    # size and two items, then a value of each item
+    assert counter.api_calls == 5
+
+    item = array[0]
+    assert item.isSame(item)
+    assert len(array) == 2
+    assert counter.api_calls == 8
+
+
+def test_phases_count_backend_calls(tmp_path):
+    emitter = GraphEmitter(MemoryGraphBackend())
+    emitter.profiler = Profiler()
+    emitter.parse_module(ast.parse('_OUT_ = sin(get_float("$time")) * 2.0\n'))
+
+    trace_path = tmp_path / "trace.json"
+    emitter.profiler.write(str(trace_path))
+    phases = json.loads(trace_path.read_text())["phases"]
+
+    # nested phases (emit.read_state, emit.layout) count their own calls
+    assert sum(sum(phase["calls"].values()) for phase in phases if phase["name"].startswith("emit")) == \
+        emitter.backend.api_calls
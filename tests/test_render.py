@@ -0,0 +1,35 @@
+import ast
+
+from sexcompiler import Compiler, render_source_lines
+from sexreport import line_stats
+
+
+def test_plain_lines():
+    rendered, lines = render_source_lines("x = 1.0\ny = 2.0\n", ".")
+    assert rendered == "x = 1.0\ny = 2.0"
+    assert lines == [1, 2]
+
+
+def test_lines_after_comments():
+    src = "x = 1.0\n{# disabled #}\ny = 2.0\nz = 3.0\n{# two\nlines #}\nw = 4.0\n"
+    rendered, lines = render_source_lines(src, ".")
+    assert rendered.splitlines() == ["x = 1.0", "y = 2.0", "z = 3.0", "w = 4.0"]
+    assert lines == [1, 3, 4, 7]
+
+
+def test_loop_lines():
+    src = "x = 1.0\n{% for i in range(2) %}\ny{{ i }} = x\n{% endfor %}\nz = 3.0\n"
+    rendered, lines = render_source_lines(src, ".")
+    assert rendered.splitlines() == ["x = 1.0", "y0 = x", "y1 = x", "z = 3.0"]
+    assert lines == [1, 3, 3, 5]
+
+
+def test_line_report_groups_rendered_lines():
+    src = "p = get_float2(\"$pos\")\nv = p.x\n{% for i in range(3) %}\nv = sin(v * {{ i }}.5)\n{% endfor %}\n_OUT_ = v\n"
+    rendered, lines = render_source_lines(src, ".")
+    ir_graph = Compiler().compile_module(ast.parse(rendered))
+
+    snippet_line, rendered_lines, nodes, _ = line_stats(ir_graph, lines)[0]
+    assert snippet_line == 4
+    assert len(rendered_lines) == 3
+    assert nodes == 9
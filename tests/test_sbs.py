@@ -0,0 +1,65 @@
+import ast
+import xml.etree.ElementTree as ET
+
+from sexcompiler import Compiler
+from sexsbs import SbsWriter, function_inputs, sbs_types
+
+def write_function(tmp_path, src: str, declared_inputs: list = None) -> tuple:
+    compiler = Compiler()
+    ir_graph = compiler.compile_module(ast.parse(src))
+    inputs = function_inputs(ir_graph, declared_inputs, compiler.set_variables)
+
+    writer = SbsWriter()
+    writer.add_function("graph", ir_graph, inputs)
+    path = tmp_path / "graph.sbs"
+    writer.write(str(path))
+
+    return ir_graph, ET.parse(str(path)).getroot()
+
+
+def value(element: ET.Element, path: str) -> str:
+    return element.find(path).get("v")
+
+
+def test_function_structure(tmp_path):
+    ir_graph, package = write_function(tmp_path, '_OUT_ = tofloat(get_int("count") + 3) * get_float2("$pos").x\n')
+
+    function = package.find("content/function")
+    assert value(function, "identifier") == "graph"
+    assert value(function, "type") == str(sbs_types["float"])
+
+    nodes = function.findall("paramValue/dynamicValue/nodes/paramNode")
+    assert [value(node, "function") for node in nodes] == \
+        [node.definition[len("sbs::function::"):] for node in ir_graph.nodes]
+
+    uids = [value(node, "uid") for node in nodes]
+    assert len(set(uids)) == len(uids)
+    assert value(function, "paramValue/dynamicValue/rootnode") == uids[ir_graph.output.index]
+
+    for node, element in zip(ir_graph.nodes, nodes):
+        connections = {value(c, "identifier"): value(c, "connRef") for c in element.findall("connections/connection")}
+        assert connections == {name: uids[input_node.index] for name, input_node in node.inputs.items()}
+
+
+def test_constant_tags(tmp_path):
+    ir_graph, package = write_function(tmp_path, '_OUT_ = tofloat(get_int("count") + 3) * get_float2("$pos").x\n')
+    nodes = package.findall("content/function/paramValue/dynamicValue/nodes/paramNode")
+
+    int_constant = nodes[[node.constant for node in ir_graph.nodes].index(("int", 3))]
+    assert value(int_constant, "funcDatas/funcData/constantValue/constantValueInt32") == "3"
+
+    swizzle = nodes[[node.definition for node in ir_graph.nodes].index("sbs::function::swizzle1")]
+    assert value(swizzle, "funcDatas/funcData/constantValue/constantValueInt32") == "0"
+
+
+def test_param_inputs(tmp_path):
+    src = """
+_OUT_ = sequence(setvar("offset", get_float("scale") * 2.0), tofloat(get_int("count")) + get_float("offset") + get_float2("$pos").x)
+"""
+    _, package = write_function(tmp_path, src, [("seed", "int")])
+    param_inputs = package.findall("content/function/paramInputs/paramInput")
+
+    assert [(value(i, "identifier"), value(i, "type")) for i in param_inputs] == \
+        [("seed", str(sbs_types["int"])), ("scale", str(sbs_types["float"])), ("count", str(sbs_types["int"]))]
+    assert value(param_inputs[0], "defaultValue/constantValueInt32") == "0"
+    assert value(param_inputs[1], "defaultValue/constantValueFloat1") == "0.0"
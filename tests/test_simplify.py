@@ -0,0 +1,74 @@
+import ast
+
+from sexcompiler import Compiler
+from sexir import IRGraph, IRNode
+from sexsimplify import simplify_node
+
+
+def float_node(index: int, constant: tuple = None) -> IRNode:
+    definition = "sbs::function::const_float1" if constant is not None else "sbs::function::get_float1"
+    return IRNode(index, definition, constant=constant, node_type="float")
+
+
+def test_identities():
+    x, zero, one = float_node(0), float_node(1, ("float", 0.0)), float_node(2, ("float", 1.0))
+
+    assert simplify_node("sbs::function::add", "float", {"a": x, "b": zero}, {"b": zero.constant}) is x
+    assert simplify_node("sbs::function::mul", "float", {"a": one, "b": x}, {"a": one.constant}) is x
+    assert simplify_node("sbs::function::sub", "float", {"a": x, "b": zero}, {"b": zero.constant}) is x
+
+
+def test_annihilator():
+    x, zero = float_node(0), float_node(1, ("float", 0.0))
+    assert simplify_node("sbs::function::mul", "float", {"a": x, "b": zero}, {"b": zero.constant}) == ("float", 0.0)
+
+
+def test_double_negation():
+    x = float_node(0)
+    neg = IRNode(1, "sbs::function::neg", {"a": x}, node_type="float")
+    assert simplify_node("sbs::function::neg", "float", {"a": neg}, {}) is x
+
+
+def test_operand_of_other_type_is_kept():
+    # 0 + x can't be replaced by x when the node has to produce another type
+    x, zero = float_node(0), float_node(1, ("float", 0.0))
+    assert simplify_node("sbs::function::add", "float2", {"a": x, "b": zero}, {"b": zero.constant}) is None
+
+
+def test_nothing_to_simplify():
+    x, y = float_node(0), float_node(1)
+    assert simplify_node("sbs::function::add", "float", {"a": x, "b": y}, {}) is None
+
+
+def compile_definitions(src: str) -> list:
+    return [node.definition for node in Compiler().compile_module(ast.parse(src)).nodes]
+
+
+def test_operands_setting_variables_are_kept():
+    src = """
+x = get_float("$x")
+_OUT_ = sequence(setvar("v", x) * 0.0, get_float("v"))
+"""
+    definitions = compile_definitions(src)
+    assert "sbs::function::set" in definitions
+    assert "sbs::function::mul" in definitions
+
+
+def test_short_circuit_keeps_operands_setting_variables():
+    src = """
+flag = get_bool("$flag")
+_OUT_ = sequence(False and setvar("b", flag), get_bool("b"))
+"""
+    assert "sbs::function::set" in compile_definitions(src)
+
+
+def test_side_effects_are_inherited():
+    x = float_node(0)
+    setter = IRNode(1, "sbs::function::set", {"value": x}, ("string", "v"), node_type="float", side_effects=True)
+    zero = float_node(2, ("float", 0.0))
+    assert simplify_node("sbs::function::mul", "float", {"a": setter, "b": zero}, {"b": zero.constant}) is None
+
+    ir_graph = IRGraph()
+    source = ir_graph.add_node("sbs::function::set", {"value": ir_graph.add_node("sbs::function::get_float1")}, side_effects=True)
+    assert ir_graph.add_node("sbs::function::sin", {"a": source}).side_effects
+    assert not ir_graph.add_node("sbs::function::get_float2").side_effects
@@ -0,0 +1,38 @@
+import ast
+
+import pytest
+
+from sexcompiler import Compiler, ParserError
+from sextypes import TypeCheckError, check_signature, function_signature, infer_type
+
+
+def test_builtin_output_type():
+    assert infer_type("sbs::function::add", {"a": "float2", "b": "float2"}) == "float2"
+    assert infer_type("sbs::function::vector3", {"componentsin": "float2", "componentslast": "float"}) == "float3"
+    assert infer_type("sbs::function::swizzle1", {"vector": "float4"}) == "float"
+
+
+def test_mismatch():
+    with pytest.raises(TypeCheckError):
+        infer_type("sbs::function::add", {"a": "float2", "b": "float3"})
+
+    with pytest.raises(TypeCheckError):
+        infer_type("sbs::function::vector4", {"componentsin": "float2", "componentslast": "float"})
+
+
+def test_unknown_types_are_not_reported():
+    assert infer_type("sbs::function::add", {"a": None, "b": "float"}) == "float"
+    assert infer_type("sbs::function::unknown_node", {"a": "float"}) is None
+
+
+def test_function_signature():
+    signature = function_signature(["x", "scale"], ["float2", "float"], "float2")
+    assert check_signature(signature, {"x": "float2", "scale": "float"}) == "float2"
+
+    with pytest.raises(TypeCheckError):
+        check_signature(signature, {"x": "float", "scale": "float"})
+
+
+def test_compile_error_points_at_operator():
+    with pytest.raises(ParserError, match=r"\[line 2: col 8\].*Type mismatch"):
+        Compiler().compile_module(ast.parse('p = get_float2("$pos")\n_OUT_ = p + 1.0\n'))